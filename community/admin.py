@@ -2,11 +2,20 @@ from django.contrib import admin
 from .models import (
     CommunityGroup, 
     CommunityMembership, 
-    CommunityPost
+    CommunityPost,
+    CommunityActivity,
+    CommunityDailyStats,
+    CommunityEnrollmentRule
 )
 
+class CommunityEnrollmentRuleInline(admin.TabularInline):
+    model = CommunityEnrollmentRule
+    extra = 0
+    readonly_fields = ['created_at']
+
 @admin.register(CommunityGroup)
 class CommunityGroupAdmin(admin.ModelAdmin):
+    inlines = [CommunityEnrollmentRuleInline]
     list_display = ['name', 'created_by', 'member_count', 'is_private', 'is_active', 'created_at']
     search_fields = ['name', 'description', 'created_by__username']
     list_filter = ['is_active', 'is_private', 'created_at']
@@ -26,9 +35,9 @@ class CommunityGroupAdmin(admin.ModelAdmin):
     
 @admin.register(CommunityMembership)
 class CommunityMembershipAdmin(admin.ModelAdmin):
-    list_display = ['user', 'community', 'role', 'joined_at']
+    list_display = ['user', 'community', 'role', 'auto_enrolled', 'joined_at']
     search_fields = ['user__username', 'community__name']
-    list_filter = ['role', 'joined_at']
+    list_filter = ['role', 'auto_enrolled', 'joined_at']
     readonly_fields = ['joined_at']
 
 @admin.register(CommunityPost)
@@ -49,3 +58,16 @@ class CommunityPostAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+@admin.register(CommunityActivity)
+class CommunityActivityAdmin(admin.ModelAdmin):
+    list_display = ['community', 'recent_posts', 'member_growth', 'score', 'updated_at']
+    search_fields = ['community__name']
+    readonly_fields = ['updated_at']
+
+@admin.register(CommunityDailyStats)
+class CommunityDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['community', 'date', 'posts', 'active_posters', 'joins', 'leaves', 'updated_at']
+    search_fields = ['community__name']
+    list_filter = ['date']
+    readonly_fields = ['updated_at']
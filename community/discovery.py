@@ -0,0 +1,118 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CommunityGroup, CommunityActivity, CommunityDailyStats
+
+# activity score weights, applied to log-scaled counts
+POSTS_WEIGHT = 1.0
+GROWTH_WEIGHT = 2.0
+
+# text relevance is scaled up so it leads and activity orders similar matches
+TEXT_WEIGHT = 10.0
+
+# fallback relevance per term when full-text search is unavailable
+NAME_PREFIX_RELEVANCE = 1.0
+NAME_RELEVANCE = 0.6
+DESCRIPTION_RELEVANCE = 0.2
+
+MAX_TERMS = 5
+
+# text search configuration; fixed (not the server default) so the GIN index
+# from migration 0009_community_search_index can serve the query
+SEARCH_CONFIG = 'english'
+
+
+def get_activity_score(recent_posts, member_growth):
+    return POSTS_WEIGHT * math.log1p(recent_posts) + GROWTH_WEIGHT * math.log1p(max(member_growth, 0))
+
+
+def refresh_community_activity(days=None, batch_size=500):
+
+    '''
+    Recompute the CommunityActivity rollup for every active community from
+    the daily rollups: posts and net member growth (joins - leaves) over the
+    last `days` days, and the derived score
+    Returns the number of communities written
+    '''
+
+    days = days or getattr(settings, 'COMMUNITY_ACTIVITY_WINDOW_DAYS', 7)
+    since = timezone.localdate() - timedelta(days=days - 1)
+
+    totals = CommunityDailyStats.objects.filter(
+        date__gte=since
+    ).values('community_id').annotate(
+        posts=Sum('posts'),
+        growth=Sum('joins') - Sum('leaves')
+    )
+    recent_posts = {row['community_id']: row['posts'] for row in totals}
+    member_growth = {row['community_id']: row['growth'] for row in totals}
+
+    rows = []
+    for community_id in CommunityGroup.objects.filter(is_active=True).values_list('id', flat=True):
+        posts = recent_posts.get(community_id, 0)
+        growth = member_growth.get(community_id, 0)
+        rows.append(CommunityActivity(
+            community_id=community_id,
+            recent_posts=posts,
+            member_growth=growth,
+            score=get_activity_score(posts, growth)
+        ))
+
+    CommunityActivity.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        # MySQL upserts on any unique key and rejects an explicit target
+        unique_fields=['community'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=['recent_posts', 'member_growth', 'score', 'updated_at']
+    )
+    return len(rows)
+
+
+def search_communities(queryset, query):
+
+    '''
+    Filter and rank communities for discovery
+    Matches name/description with PostgreSQL full-text search (name weighted
+    above description), or case-insensitive term matching on other databases.
+    The rank adds the precomputed activity score, so it never aggregates posts.
+    Without a query communities are ranked by activity alone
+    '''
+
+    activity = Coalesce(F('activity__score'), Value(0.0), output_field=FloatField())
+    terms = query.split()[:MAX_TERMS]
+
+    if not terms:
+        relevance = Value(0.0, output_field=FloatField())
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        # must stay identical to the indexed expression
+        vector = (
+            SearchVector('name', weight='A', config=SEARCH_CONFIG) +
+            SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        )
+        search = SearchQuery(' '.join(terms), search_type='websearch', config=SEARCH_CONFIG)
+        queryset = queryset.annotate(document=vector).filter(document=search)
+        relevance = SearchRank(vector, search)
+    else:
+        relevance = Value(0.0, output_field=FloatField())
+        for term in terms:
+            queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+            relevance = relevance + Case(
+                When(name__istartswith=term, then=Value(NAME_PREFIX_RELEVANCE)),
+                When(name__icontains=term, then=Value(NAME_RELEVANCE)),
+                default=Value(DESCRIPTION_RELEVANCE),
+                output_field=FloatField()
+            )
+
+    return queryset.annotate(
+        relevance=relevance,
+        rank=TEXT_WEIGHT * relevance + activity
+    ).order_by('-rank', '-member_count', 'id')
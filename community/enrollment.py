@@ -0,0 +1,149 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from portal.models import UserProfile
+from .models import (
+    CommunityGroup,
+    CommunityMembership,
+    CommunityMembershipEvent,
+    CommunityEnrollmentRule
+)
+from .permissions import invalidate_memberships_after_commit
+from .rollups import queue_recount
+from .utils import adjust_member_count
+
+# rule field -> UserProfile field it matches
+RULE_FIELDS = {
+    'department': 'department',
+    'course': 'course',
+    'profile_role': 'role',
+}
+
+
+def get_rule_filter(rules):
+
+    '''Q selecting the profiles matched by any of the rules'''
+
+    match = Q(pk__in=[])
+    for rule in rules:
+        conditions = {
+            profile_field: getattr(rule, rule_field)
+            for rule_field, profile_field in RULE_FIELDS.items()
+            if getattr(rule, rule_field)
+        }
+        match |= Q(**conditions)
+    return match
+
+
+def get_enrollment_candidates(community, rules, user_ids=None):
+
+    '''
+    user_ids of active users the rules select who are not members yet, as a
+    single query: existing members and users who left the community before
+    (so leaving opts out of auto-enrollment) are excluded in SQL
+    '''
+
+    members = CommunityMembership.objects.filter(community=community, user_id=OuterRef('user_id'))
+    left = CommunityMembershipEvent.objects.filter(community=community, user_id=OuterRef('user_id'), event='leave')
+
+    candidates = UserProfile.objects.filter(
+        get_rule_filter(rules),
+        user__is_active=True
+    ).exclude(Exists(members)).exclude(Exists(left))
+
+    if user_ids is not None:
+        candidates = candidates.filter(user_id__in=user_ids)
+    return candidates.order_by('user_id').values_list('user_id', flat=True)
+
+
+def enroll_community(community, user_ids=None, batch_size=1000):
+
+    '''
+    Add the users matched by the community's active enrollment rules
+    Candidates are read in keyset batches and inserted with
+    bulk_create(ignore_conflicts=True), so a concurrent join is skipped
+    rather than failing the run; a join event is logged for every membership
+    created and member_count is adjusted once, in the same transaction.
+    The community row is locked for the run, so overlapping runs for one
+    community (signals, the command) take turns instead of counting the
+    same memberships twice.
+    Pass user_ids to only consider those users (incremental runs).
+    Returns the number of memberships created
+    '''
+
+    rules = list(community.enrollment_rules.filter(is_active=True))
+    if not rules or not community.is_active:
+        return 0
+
+    candidates = get_enrollment_candidates(community, rules, user_ids)
+    enrolled = 0
+    last_id = 0
+
+    with transaction.atomic():
+        # candidates are read after the lock, so a run that held it is fully visible
+        CommunityGroup.objects.select_for_update().only('id').get(pk=community.pk)
+
+        while True:
+            batch = list(candidates.filter(user_id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            CommunityMembership.objects.bulk_create([
+                CommunityMembership(user_id=user_id, community=community, auto_enrolled=True)
+                for user_id in batch
+            ], ignore_conflicts=True)
+
+            # ignore_conflicts returns no ids; re-read which rows this run created
+            # (other runs are locked out, manual memberships are not auto_enrolled)
+            created = list(CommunityMembership.objects.filter(
+                community=community,
+                user_id__in=batch,
+                auto_enrolled=True
+            ).values_list('user_id', flat=True))
+
+            events = CommunityMembershipEvent.objects.bulk_create([
+                CommunityMembershipEvent(community=community, user_id=user_id, event='join')
+                for user_id in created
+            ])
+            # this transaction can outlast the rollup's overlap window
+            queue_recount((community.id, event.created_at) for event in events)
+            # bulk_create sends no signals
+            invalidate_memberships_after_commit(created)
+
+            enrolled += len(created)
+            last_id = batch[-1]
+
+        if enrolled:
+            adjust_member_count(community, enrolled)
+
+    return enrolled
+
+
+def enroll_users(user_ids, batch_size=1000):
+
+    '''
+    Incremental run for users whose profile was created or changed: only the
+    communities with a rule matching one of their profiles are checked.
+    Returns the number of memberships created
+    '''
+
+    user_ids = list(user_ids)
+    profiles = UserProfile.objects.filter(
+        user_id__in=user_ids,
+        user__is_active=True
+    ).values_list('department', 'course', 'role').distinct()
+
+    # a rule matches when each of its fields is blank or equals the profile's
+    match = Q(pk__in=[])
+    for department, course, role in profiles:
+        match |= Q(department__in=['', department], course__in=['', course], profile_role__in=['', role])
+
+    community_ids = CommunityEnrollmentRule.objects.filter(
+        match,
+        is_active=True
+    ).values('community_id')
+
+    enrolled = 0
+    for community in CommunityGroup.objects.filter(id__in=community_ids, is_active=True):
+        enrolled += enroll_community(community, user_ids, batch_size)
+    return enrolled
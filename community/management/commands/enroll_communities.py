@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from community.enrollment import enroll_community, get_enrollment_candidates
+from community.models import CommunityGroup
+
+
+class Command(BaseCommand):
+
+    '''
+    Full auto-enrollment run: add every active user matched by each
+    community's enrollment rules. Profile changes, activations and rule edits
+    re-run it incrementally through community/signals.py; this command covers
+    the rest, e.g. after a bulk import or term start
+    '''
+
+    help = 'Enroll matching users into communities with enrollment rules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--community', type=int, action='append', dest='communities', help='Only this community id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Memberships created per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many users would be enrolled')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+        communities = CommunityGroup.objects.filter(
+            is_active=True,
+            enrollment_rules__is_active=True
+        ).distinct().order_by('id')
+        if options['communities']:
+            communities = communities.filter(id__in=options['communities'])
+
+        total = 0
+        for community in communities:
+            if options['dry_run']:
+                rules = community.enrollment_rules.filter(is_active=True)
+                enrolled = get_enrollment_candidates(community, rules).count()
+            else:
+                enrolled = enroll_community(community, batch_size=options['batch_size'])
+
+            total += enrolled
+            if options['verbosity'] > 1 or enrolled:
+                self.stdout.write(f'{community.name}: {enrolled}')
+
+        elapsed = time.monotonic() - started
+        action = 'Would enroll' if options['dry_run'] else 'Enrolled'
+        self.stdout.write(self.style.SUCCESS(f'{action} {total} users, took {elapsed:.2f}s'))
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from community.models import CommunityGroup, CommunityMembership
+
+
+class Command(BaseCommand):
+
+    '''
+    Recompute CommunityGroup.member_count from CommunityMembership
+    Only communities whose stored count drifted are written back
+    '''
+
+    help = 'Repair drift in the denormalized community member counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Communities checked per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted communities')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+        members = CommunityMembership.objects.filter(
+            community=OuterRef('pk')
+        ).values('community').annotate(total=Count('id')).values('total')
+
+        communities = CommunityGroup.objects.annotate(
+            actual_members=Coalesce(Subquery(members), 0)
+        ).only('id', 'member_count').order_by('id')
+
+        checked = 0
+        repaired = 0
+        last_id = 0
+
+        while True:
+            batch = list(communities.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            drifted = []
+            for community in batch:
+                if community.member_count != community.actual_members:
+                    community.member_count = community.actual_members
+                    drifted.append(community)
+
+            if drifted and not options['dry_run']:
+                CommunityGroup.objects.bulk_update(drifted, ['member_count'])
+
+            checked += len(batch)
+            repaired += len(drifted)
+            last_id = batch[-1].id
+
+        elapsed = time.monotonic() - started
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {repaired} of {checked} communities with drifted member counts, took {elapsed:.2f}s'
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from community.discovery import refresh_community_activity
+
+
+class Command(BaseCommand):
+
+    '''
+    Periodic batch job that rebuilds the CommunityActivity rollup used to
+    rank community discovery
+    '''
+
+    help = 'Recompute recent activity scores for every active community'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'COMMUNITY_ACTIVITY_WINDOW_DAYS', 7),
+            help='Activity window in days'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per batch')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+        updated = refresh_community_activity(days=options['days'], batch_size=options['batch_size'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed activity for {updated} communities, took {elapsed:.2f}s'
+        ))
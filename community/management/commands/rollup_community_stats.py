@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from community.discovery import refresh_community_activity
+from community.rollups import rollup_community_stats
+
+
+class Command(BaseCommand):
+
+    '''
+    Periodic job that fills the CommunityDailyStats rollup from the posts
+    and membership events created since the last run, then refreshes the
+    discovery activity scores from it
+    '''
+
+    help = 'Incrementally roll up daily community activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag',
+            type=int,
+            default=getattr(settings, 'COMMUNITY_ROLLUP_LAG_SECONDS', 60),
+            help='Leave rows younger than this many seconds for the next run'
+        )
+        parser.add_argument(
+            '--overlap',
+            type=int,
+            default=getattr(settings, 'COMMUNITY_ROLLUP_OVERLAP_SECONDS', 600),
+            help='Also rescan this many seconds behind the watermark for late commits'
+        )
+        parser.add_argument('--rebuild', action='store_true', help='Clear the rollup and recompute every day')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per batch')
+        parser.add_argument('--skip-activity', action='store_true', help='Do not refresh the discovery activity scores')
+
+    def handle(self, *args, **options):
+        if options['lag'] < 0:
+            raise CommandError('--lag must be 0 or more')
+        if options['overlap'] < 0:
+            raise CommandError('--overlap must be 0 or more')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+        written = rollup_community_stats(
+            lag_seconds=options['lag'],
+            rebuild=options['rebuild'],
+            batch_size=options['batch_size'],
+            overlap_seconds=options['overlap']
+        )
+        self.stdout.write(f'Wrote {written} daily rows')
+
+        if not options['skip_activity']:
+            refreshed = refresh_community_activity(batch_size=options['batch_size'])
+            self.stdout.write(f'Refreshed activity for {refreshed} communities')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Community rollup finished, took {elapsed:.2f}s'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0002_alter_communitygroup_image_alter_communitypost_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['community', 'is_pinned', '-created_at', '-id'], name='community_post_pinned_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0003_communitypost_pinned_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['community', '-created_at', '-id'], name='community_post_feed_idx'),
+        ),
+    ]
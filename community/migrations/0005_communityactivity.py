@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0004_communitypost_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityActivity',
+            fields=[
+                ('community', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to='community.communitygroup')),
+                ('recent_posts', models.PositiveIntegerField(default=0)),
+                ('member_growth', models.IntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Community Activity',
+                'verbose_name_plural': 'Community Activity',
+            },
+        ),
+    ]
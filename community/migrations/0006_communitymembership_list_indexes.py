@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0005_communityactivity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['community', '-joined_at', '-id'], name='community_member_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitymembership',
+            index=models.Index(fields=['community', 'role', '-joined_at', '-id'], name='community_member_role_idx'),
+        ),
+    ]
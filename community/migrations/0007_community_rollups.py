@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0006_communitymembership_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityMembershipEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('join', 'Join'), ('leave', 'Leave')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='membership_events', to='community.communitygroup')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Community Membership Event',
+                'verbose_name_plural': 'Community Membership Events',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CommunityDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('active_posters', models.PositiveIntegerField(default=0)),
+                ('joins', models.PositiveIntegerField(default=0)),
+                ('leaves', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='community.communitygroup')),
+            ],
+            options={
+                'verbose_name': 'Community Daily Stats',
+                'verbose_name_plural': 'Community Daily Stats',
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('community', 'date'), name='community_daily_stats_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CommunityRollupWatermark',
+            fields=[
+                ('source', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('processed_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0007_community_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communitymembership',
+            name='auto_enrolled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='CommunityEnrollmentRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, choices=[('ccis', 'College of Computing and Information Sciences'), ('coe', 'College of Engineering'), ('cbt', 'College of Business and Technology'), ('cas', 'College of Arts and Sciences'), ('cte', 'College of Teacher Education')], max_length=50)),
+                ('course', models.CharField(blank=True, choices=[('bscs', 'Bachelor of Science in Computer Science'), ('bsit', 'Bachelor of Science in Information Technology'), ('bsis', 'Bachelor of Science in Information Systems'), ('bsce', 'Bachelor of Science in Civil Engineering'), ('bsee', 'Bachelor of Science in Electrical Engineering'), ('bsece', 'Bachelor of Science in Electronics and Engineering'), ('bscpe', 'Bachelor of Science in Computer Engineering'), ('bet', 'Bachelor of Engineering Technology'), ('baet', 'Bachelor of Automotive Engineering Technology'), ('beet', 'Bachelor of Electrical Engineering Technology'), ('bexet', 'Bachelor of Electronics Engineering Technology'), ('bmet', 'Bachelor of Mechanical Engineering Technology'), ('bmet-mt', 'BMET - Mechanical Technology'), ('bmet-ract', 'BMET - Refrigeration and Air-conditioning Technology'), ('bmet-waft', 'BMET - Welding and Fabrication Technology'), ('bit', 'Bachelor in Industrial Technology '), ('bit-adt', 'Architectural Drafting'), ('bit-at', 'Automotive Technology'), ('bit-elt', 'Electrical Technology'), ('bit-elex', 'Electronics Technology'), ('bit-mt', 'Mechanical Technology'), ('bit-hvacr', 'Heating, Ventilating & Air-Conditioning technology'), ('bit-waft', 'Welding & Fabrication Technology'), ('bshm', 'Bachelor of Science in Hospitality Management'), ('bsmt', 'Bachelor of Science in Tourism Management'), ('bsm', 'Bachelor of Science in Mathematics'), ('bses', 'Bachelor of Science in Environmental Science'), ('bael', 'Bachelor of Arts in English Language'), ('beed', 'Bachelor of Elementary Education'), ('bsed', 'Bachelor of Secondary Education'), ('bped', 'Bachelor of Physical Education'), ('btvted', 'Bachelor of Technical-Vocational Teacher Education')], max_length=50)),
+                ('profile_role', models.CharField(blank=True, choices=[('student', 'Student'), ('faculty', 'Faculty')], default='student', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_rules', to='community.communitygroup')),
+            ],
+            options={
+                'verbose_name': 'Community Enrollment Rule',
+                'verbose_name_plural': 'Community Enrollment Rules',
+                'ordering': ['community', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 23:20
+
+from django.db import migrations
+
+
+# GIN index over the weighted search vector used by community discovery
+# (community/discovery.py search_communities). PostgreSQL only: the query
+# falls back to icontains matching on other databases. The expression, text
+# search config included, must match the query for the planner to use it.
+INDEX_NAME = 'community_group_search_idx'
+
+
+def get_search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector('name', weight='A', config='english') +
+        SearchVector('description', weight='B', config='english'),
+        name=INDEX_NAME
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('community', 'CommunityGroup'), get_search_index())
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('community', 'CommunityGroup'), get_search_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0008_community_enrollment'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0009_community_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityStatsRecount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('community_id', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Community Stats Recount',
+                'verbose_name_plural': 'Community Stats Recounts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['created_at'], name='community_post_created_idx'),
+        ),
+    ]
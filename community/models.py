@@ -3,6 +3,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
+from portal.models import UserProfile
+
 class CommunityGroup(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField()
@@ -36,6 +38,7 @@ class CommunityMembership(models.Model):
     community = models.ForeignKey(CommunityGroup, on_delete=models.CASCADE, related_name='memberships')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
     joined_at = models.DateTimeField(auto_now_add=True)
+    auto_enrolled = models.BooleanField(default=False)
     
     def __str__(self):
         return f'{self.user.username} - {self.community.name} ({self.role})'
@@ -45,6 +48,11 @@ class CommunityMembership(models.Model):
         ordering = ['-joined_at']
         verbose_name = 'Community Membership'
         verbose_name_plural = 'Community Memberships'
+        indexes = [
+            # member list pages, all members and filtered by role
+            models.Index(fields=['community', '-joined_at', '-id'], name='community_member_joined_idx'),
+            models.Index(fields=['community', 'role', '-joined_at', '-id'], name='community_member_role_idx'),
+        ]
         
 
 class CommunityPost(models.Model):
@@ -65,4 +73,148 @@ class CommunityPost(models.Model):
         ordering = ['-is_pinned', '-created_at']
         verbose_name = 'Community Post'
         verbose_name_plural = 'Community Posts'
+        indexes = [
+            # pinned head and keyset pages of the post list
+            models.Index(fields=['community', 'is_pinned', '-created_at', '-id'], name='community_post_pinned_idx'),
+            # per-community streams of the merged "my communities" feed
+            models.Index(fields=['community', '-created_at', '-id'], name='community_post_feed_idx'),
+            # new-row scans of the daily rollup
+            models.Index(fields=['created_at'], name='community_post_created_idx'),
+        ]
+    
+
+
+class CommunityActivity(models.Model):
+    
+    '''
+    Precomputed activity signals used to rank community discovery, refreshed
+    in batch by `python manage.py refresh_community_activity`
+    '''
+    
+    community = models.OneToOneField(CommunityGroup, on_delete=models.CASCADE, primary_key=True, related_name='activity')
+    recent_posts = models.PositiveIntegerField(default=0)
+    member_growth = models.IntegerField(default=0)
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.community.name} activity ({self.score:.2f})'
+    
+    class Meta:
+        verbose_name = 'Community Activity'
+        verbose_name_plural = 'Community Activity'
+
+
+class CommunityMembershipEvent(models.Model):
+    
+    '''
+    Append-only log of joins and leaves (memberships are deleted on leave),
+    read by the daily rollup
+    '''
+    
+    EVENT_CHOICES = [
+        ('join', 'Join'),
+        ('leave', 'Leave'),
+    ]
+    
+    community = models.ForeignKey(CommunityGroup, on_delete=models.CASCADE, related_name='membership_events')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    event = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f'{self.community.name} {self.event} ({self.created_at:%Y-%m-%d})'
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Community Membership Event'
+        verbose_name_plural = 'Community Membership Events'
+
+
+class CommunityDailyStats(models.Model):
+    
+    '''
+    Per-community, per-day activity rollup, filled incrementally by
+    `python manage.py rollup_community_stats`; days are in TIME_ZONE
+    '''
+    
+    community = models.ForeignKey(CommunityGroup, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    posts = models.PositiveIntegerField(default=0)
+    active_posters = models.PositiveIntegerField(default=0)
+    joins = models.PositiveIntegerField(default=0)
+    leaves = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.community.name} {self.date}'
     
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Community Daily Stats'
+        verbose_name_plural = 'Community Daily Stats'
+        constraints = [
+            models.UniqueConstraint(fields=['community', 'date'], name='community_daily_stats_unique'),
+        ]
+
+
+class CommunityStatsRecount(models.Model):
+    
+    '''
+    A (community, day) whose daily stats must be recomputed although no new
+    row shows it, e.g. a deleted post. Written in the same transaction as the
+    change and consumed by the next rollup run. community_id is a plain
+    column so rows survive the community being deleted
+    '''
+    
+    community_id = models.BigIntegerField()
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f'recount community {self.community_id} {self.date}'
+    
+    class Meta:
+        verbose_name = 'Community Stats Recount'
+        verbose_name_plural = 'Community Stats Recounts'
+
+
+class CommunityRollupWatermark(models.Model):
+    
+    '''How far (by created_at) each rollup source has been processed'''
+    
+    source = models.CharField(max_length=50, primary_key=True)
+    processed_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.source} until {self.processed_until}'
+
+
+class CommunityEnrollmentRule(models.Model):
+    
+    '''
+    Auto-enrollment rule: active users whose profile matches every field set
+    on the rule are added to the community by the enrollment job
+    (community/enrollment.py). Blank fields match any value
+    '''
+    
+    community = models.ForeignKey(CommunityGroup, on_delete=models.CASCADE, related_name='enrollment_rules')
+    department = models.CharField(max_length=50, choices=UserProfile.DEPARTMENT_CHOICES, blank=True)
+    course = models.CharField(max_length=50, choices=UserProfile.COURSE_CHOICES, blank=True)
+    profile_role = models.CharField(max_length=10, choices=UserProfile.ROLE_CHOICES, blank=True, default='student')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def clean(self):
+        if not self.department and not self.course:
+            raise ValidationError('An enrollment rule needs a department or a course')
+    
+    def __str__(self):
+        matches = [value for value in (self.department, self.course, self.profile_role) if value]
+        return f"{self.community.name} <- {' / '.join(matches)}"
+    
+    class Meta:
+        ordering = ['community', 'id']
+        verbose_name = 'Community Enrollment Rule'
+        verbose_name_plural = 'Community Enrollment Rules'
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from stream.caching import bump_cache_versions, get_cache_version, is_shared_cache
+from .models import CommunityMembership
+
+MODERATOR_ROLES = ('moderator', 'admin')
+
+
+def _version_key(user_id):
+    return f'community:memberships-version:{user_id}'
+
+
+def _memberships_key(user_id, version):
+    return f'community:memberships:{user_id}:v{version}'
+
+
+def get_cached_memberships(user):
+
+    '''
+    Every membership of the user as {community_id: role}, from a short-TTL
+    versioned cache; a miss falls back to one query and refills it.
+    Membership writes invalidate it, see community/signals.py. These are
+    authorization decisions, so without a cache shared by every worker
+    (invalidation would only reach one of them) it always queries
+    '''
+
+    if not user.is_authenticated:
+        return {}
+
+    shared = is_shared_cache()
+    key = _memberships_key(user.id, get_cache_version(_version_key(user.id))) if shared else None
+    memberships = cache.get(key) if shared else None
+
+    if memberships is None:
+        memberships = dict(
+            CommunityMembership.objects.filter(user=user).values_list('community_id', 'role')
+        )
+        if shared:
+            cache.set(key, memberships, getattr(settings, 'COMMUNITY_MEMBERSHIP_CACHE_TTL', 300))
+
+    return memberships
+
+
+def invalidate_cached_memberships(user_ids):
+
+    '''
+    Drop the cached membership maps of user_ids by bumping their versions
+    A request that loaded stale memberships before the bump writes them under
+    the old version, which is never read again
+    '''
+
+    bump_cache_versions(_version_key(user_id) for user_id in user_ids)
+
+
+def invalidate_memberships_after_commit(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: invalidate_cached_memberships(user_ids))
+
+
+class CommunityPermissions:
+
+    '''
+    The viewer's role in each community, resolved once per request
+    Views and serializers share one instance through
+    get_community_permissions(request); the first lookup reads the viewer's
+    whole membership map from the cache (one query on a miss), later
+    lookups are served from memory
+    '''
+
+    def __init__(self, user):
+        self.user = user
+        self.roles = {}
+        self.resolved = set()
+        self.complete = False
+
+    def seed(self, memberships, complete=False):
+
+        '''
+        Use an already loaded {community_id: role} map; complete=True means it
+        holds every membership of the user, so no other community needs a query
+        '''
+
+        self.roles.update(memberships)
+        self.resolved.update(memberships)
+        self.complete = self.complete or complete
+
+    def load(self, community_ids):
+        if self.complete or not set(community_ids) - self.resolved:
+            return
+
+        # the cached map holds every membership, so it answers for all communities
+        self.seed(get_cached_memberships(self.user), complete=True)
+
+    def role(self, community_id):
+        self.load([community_id])
+        return self.roles.get(community_id)
+
+    def is_member(self, community_id):
+        return self.role(community_id) is not None
+
+    def can_moderate(self, community_id):
+        return self.role(community_id) in MODERATOR_ROLES
+
+    def can_edit_post(self, post):
+
+        '''Authors and community moderators/admins can edit or delete a post'''
+
+        if post.author_id == self.user.id:
+            return True
+        return self.can_moderate(post.community_id)
+
+    can_delete_post = can_edit_post
+
+
+def get_community_permissions(request):
+    permissions = getattr(request, '_community_permissions', None)
+    if permissions is None:
+        permissions = CommunityPermissions(request.user)
+        request._community_permissions = permissions
+    return permissions
@@ -0,0 +1,182 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CommunityGroup,
+    CommunityPost,
+    CommunityMembershipEvent,
+    CommunityDailyStats,
+    CommunityStatsRecount,
+    CommunityRollupWatermark
+)
+
+# rollup sources and the querysets they read, keyed by watermark name
+SOURCES = {
+    'posts': CommunityPost.objects,
+    'membership_events': CommunityMembershipEvent.objects,
+}
+
+
+def get_day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def queue_recount(pairs):
+
+    '''
+    Queue the days of (community_id, created_at) pairs for the next rollup
+    run to recompute; call it in the transaction making the change
+    '''
+
+    days = {(community_id, timezone.localdate(created_at)) for community_id, created_at in pairs}
+    CommunityStatsRecount.objects.bulk_create([
+        CommunityStatsRecount(community_id=community_id, date=day)
+        for community_id, day in days
+    ])
+
+
+def get_affected_days(queryset, since, until):
+
+    '''(community_id, day) pairs that received rows created in (since, until]'''
+
+    rows = queryset.filter(created_at__lte=until)
+    if since is not None:
+        rows = rows.filter(created_at__gt=since)
+    return set(
+        rows.annotate(day=TruncDate('created_at')).values_list('community_id', 'day').distinct()
+    )
+
+
+def compute_daily_stats(affected, all_days=False):
+
+    '''
+    Recompute every stat for the given (community_id, day) pairs from the
+    source tables. Whole days are recounted because distinct posters cannot
+    be added up across runs. all_days reads every row (full rebuilds)
+    '''
+
+    community_ids = {community_id for community_id, _day in affected}
+
+    days = Q()
+    if not all_days:
+        # only the affected days, so recounting an old day does not scan the history since
+        days = Q(pk__in=[])
+        for day in {day for _community_id, day in affected}:
+            days |= Q(created_at__gte=get_day_start(day), created_at__lt=get_day_start(day + timedelta(days=1)))
+
+    posts = {
+        (row['community_id'], row['day']): row
+        for row in CommunityPost.objects.filter(
+            days,
+            community_id__in=community_ids
+        ).annotate(day=TruncDate('created_at')).values('community_id', 'day').annotate(
+            posts=Count('id'),
+            active_posters=Count('author_id', distinct=True)
+        )
+    }
+    events = {
+        (row['community_id'], row['day']): row
+        for row in CommunityMembershipEvent.objects.filter(
+            days,
+            community_id__in=community_ids
+        ).annotate(day=TruncDate('created_at')).values('community_id', 'day').annotate(
+            joins=Count('id', filter=Q(event='join')),
+            leaves=Count('id', filter=Q(event='leave'))
+        )
+    }
+
+    rows = []
+    for community_id, day in sorted(affected):
+        post_row = posts.get((community_id, day), {})
+        event_row = events.get((community_id, day), {})
+        rows.append(CommunityDailyStats(
+            community_id=community_id,
+            date=day,
+            posts=post_row.get('posts', 0),
+            active_posters=post_row.get('active_posters', 0),
+            joins=event_row.get('joins', 0),
+            leaves=event_row.get('leaves', 0)
+        ))
+    return rows
+
+
+def rollup_community_stats(lag_seconds=None, rebuild=False, batch_size=500, overlap_seconds=None):
+
+    '''
+    Bring CommunityDailyStats up to date
+    Only rows created after each source's watermark are scanned to find the
+    (community, day) pairs that changed, plus the days queued for a recount
+    (deleted posts, bulk enrollment), and only those days are recomputed, so
+    re-running is cheap and idempotent. Rows younger than lag_seconds are
+    left for the next run, and each scan reaches back overlap_seconds behind
+    the watermark to pick up rows whose transaction committed late.
+    rebuild=True clears the rollup and recomputes every day from scratch.
+    Returns the number of daily rows written
+    '''
+
+    if lag_seconds is None:
+        lag_seconds = getattr(settings, 'COMMUNITY_ROLLUP_LAG_SECONDS', 60)
+    if overlap_seconds is None:
+        overlap_seconds = getattr(settings, 'COMMUNITY_ROLLUP_OVERLAP_SECONDS', 600)
+    until = timezone.now() - timedelta(seconds=lag_seconds)
+
+    watermarks = {} if rebuild else dict(
+        CommunityRollupWatermark.objects.values_list('source', 'processed_until')
+    )
+
+    affected = set()
+    for source, queryset in SOURCES.items():
+        since = watermarks.get(source)
+        if since is not None:
+            since -= timedelta(seconds=overlap_seconds)
+        affected |= get_affected_days(queryset, since, until)
+
+    recounts = list(CommunityStatsRecount.objects.values_list('id', 'community_id', 'date'))
+    if not rebuild:
+        affected |= {(community_id, day) for _id, community_id, day in recounts}
+
+    # queued days of deleted communities have nothing left to count
+    existing = set(CommunityGroup.objects.filter(
+        id__in={community_id for community_id, _day in affected}
+    ).values_list('id', flat=True))
+    affected = {(community_id, day) for community_id, day in affected if community_id in existing}
+
+    rows = compute_daily_stats(affected, all_days=rebuild) if affected else []
+
+    with transaction.atomic():
+        if rebuild:
+            # days with no rows left would otherwise keep their old counts
+            CommunityDailyStats.objects.all().delete()
+        CommunityStatsRecount.objects.filter(id__in=[recount_id for recount_id, _community_id, _day in recounts]).delete()
+        CommunityDailyStats.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            # MySQL upserts on any unique key and rejects an explicit target
+            unique_fields=['community', 'date'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=['posts', 'active_posters', 'joins', 'leaves', 'updated_at']
+        )
+        for source in SOURCES:
+            CommunityRollupWatermark.objects.update_or_create(
+                source=source,
+                defaults={'processed_until': until}
+            )
+
+    return len(rows)
+
+
+def get_rollup_freshness():
+
+    '''Time up to which every rollup source has been processed, or None'''
+
+    watermarks = list(CommunityRollupWatermark.objects.filter(
+        source__in=list(SOURCES)
+    ).values_list('processed_until', flat=True))
+    if len(watermarks) < len(SOURCES):
+        return None
+    return min(watermarks)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import CommunityGroup, CommunityMembership, CommunityPost
-from portal.serializers import UserProfileDetailSerializer
+from .permissions import get_community_permissions
+from portal.serializers import UserProfileDetailSerializer, UserCardSerializer
 
 class CommunityGroupSerializer(serializers.ModelSerializer):
     
@@ -30,24 +31,34 @@ class CommunityGroupSerializer(serializers.ModelSerializer):
         
         read_only_fields = ['created_by', 'created_at', 'member_count']
         
-    def get_is_member(self, obj):
+    def get_membership_role(self, obj):
+        
+        '''
+        viewer's role in obj, or None if not a member
+        read from the request-scoped community permissions, which list views
+        preload for the whole page (see community.utils.get_community_context)
+        '''
+        
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return CommunityMembership.objects.filter(
-                user=request.user,
-                community=obj
-            ).exists()
-        return False
+        if not (request and request.user.is_authenticated):
+            return None
+        return get_community_permissions(request).role(obj.id)
+        
+    def get_is_member(self, obj):
+        return self.get_membership_role(obj) is not None
     
     def get_user_role(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            membership = CommunityMembership.objects.filter(
-                user=request.user,
-                community=obj
-            ).first()
-            return membership.role if membership else None
-        return None
+        return self.get_membership_role(obj)
+    
+class CommunityDiscoverySerializer(CommunityGroupSerializer):
+    
+    '''community with the activity signals used to rank discovery results'''
+    
+    recent_posts = serializers.IntegerField(read_only=True)
+    member_growth = serializers.IntegerField(read_only=True)
+    
+    class Meta(CommunityGroupSerializer.Meta):
+        fields = CommunityGroupSerializer.Meta.fields + ['recent_posts', 'member_growth']
     
 class CommunityGroupCreateSerializer(serializers.ModelSerializer):
         
@@ -70,6 +81,15 @@ class CommunityGroupCreateSerializer(serializers.ModelSerializer):
         
         return value
     
+    def update(self, instance, validated_data):
+        
+        '''Write only the edited fields so member_count F() updates are never overwritten'''
+        
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+    
 class CommunityMembershipSerializer(serializers.ModelSerializer):
     
     user_profile = UserProfileDetailSerializer(source='user.profile', read_only=True)
@@ -90,6 +110,29 @@ class CommunityMembershipSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['joined_at']
         
+class CommunityMemberSerializer(serializers.ModelSerializer):
+    
+    '''
+    member list row with a compact user card
+    expects memberships with select_related('user__profile') and
+    context['following_ids'] for the page
+    '''
+    
+    username = serializers.CharField(source='user.username', read_only=True)
+    user_profile = UserCardSerializer(source='user.profile', read_only=True)
+    
+    class Meta:
+        model = CommunityMembership
+        fields = [
+            'id',
+            'user',
+            'username',
+            'user_profile',
+            'role',
+            'joined_at'
+        ]
+        read_only_fields = fields
+        
 class CommunityPostSerializer(serializers.ModelSerializer):
     
     author_username = serializers.CharField(source='author.username', read_only=True)
@@ -122,27 +165,13 @@ class CommunityPostSerializer(serializers.ModelSerializer):
     def get_can_edit(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            if obj.author == request.user:
-                return True
-            membership = CommunityMembership.objects.filter(
-                user=request.user,
-                community=obj.community,
-                role__in=['moderator', 'admin']
-            ).first()
-            return bool(membership)
+            return get_community_permissions(request).can_edit_post(obj)
         return False
     
     def get_can_delete(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            if obj.author == request.user:
-                return True
-            membership = CommunityMembership.objects.filter(
-                user=request.user,
-                community=obj.community,
-                role__in=['moderator', 'admin']
-            ).first()
-            return bool(membership)
+            return get_community_permissions(request).can_delete_post(obj)
         return False
     
     
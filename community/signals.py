@@ -0,0 +1,162 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from portal.models import UserProfile
+from stream.tasks import run_after_commit
+from .enrollment import RULE_FIELDS, enroll_community, enroll_users
+from .models import (
+    CommunityGroup,
+    CommunityMembership,
+    CommunityMembershipEvent,
+    CommunityPost,
+    CommunityEnrollmentRule
+)
+from .permissions import invalidate_memberships_after_commit
+from .rollups import queue_recount
+
+# pks of users and communities whose delete() is in progress on this thread
+_deleting = threading.local()
+
+
+def get_enrollment_key(profile):
+    # read from __dict__ so deferred fields are never loaded just for this
+    return tuple(profile.__dict__.get(field) for field in RULE_FIELDS.values())
+
+
+def enrollment_fields_changed(profile, update_fields):
+
+    '''
+    True when saving profile can change what the enrollment rules match
+    Compares against the stored row, one query, skipped when update_fields
+    leaves out department, course and role
+    '''
+
+    fields = list(RULE_FIELDS.values())
+    if profile._state.adding:
+        return True
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return False
+
+    stored = UserProfile.objects.filter(pk=profile.pk).values_list(*fields).first()
+    return stored != get_enrollment_key(profile)
+
+
+def get_deleting(model):
+    if not hasattr(_deleting, 'pks'):
+        _deleting.pks = {User: set(), CommunityGroup: set()}
+    return _deleting.pks[model]
+
+
+def enroll_community_by_id(community_id):
+    community = CommunityGroup.objects.filter(pk=community_id, is_active=True).first()
+    if community:
+        enroll_community(community)
+
+
+@receiver(pre_save, sender=UserProfile)
+def check_enrollment_fields(sender, instance, update_fields=None, **kwargs):
+    instance._enrollment_changed = enrollment_fields_changed(instance, update_fields)
+
+
+@receiver(post_save, sender=UserProfile)
+def enroll_profile(sender, instance, **kwargs):
+    
+    '''a new profile, or a changed department, course or role, may match new enrollment rules'''
+    
+    changed, instance._enrollment_changed = instance._enrollment_changed, False
+    
+    if changed and User.objects.filter(pk=instance.user_id, is_active=True).exists():
+        run_after_commit(enroll_users, [instance.user_id])
+
+
+@receiver(pre_save, sender=User)
+def check_activation(sender, instance, update_fields=None, **kwargs):
+    
+    '''flag an existing user being switched from inactive to active'''
+    
+    instance._activated = (
+        instance.is_active
+        and not instance._state.adding
+        and (update_fields is None or 'is_active' in update_fields)
+        and User.objects.filter(pk=instance.pk, is_active=False).exists()
+    )
+
+
+@receiver(post_save, sender=User)
+def enroll_activated_user(sender, instance, **kwargs):
+    
+    '''only active users are enrolled, so activation (OTP verification) re-runs the rules'''
+    
+    activated, instance._activated = instance._activated, False
+    
+    if activated:
+        run_after_commit(enroll_users, [instance.pk])
+
+
+@receiver(post_save, sender=CommunityEnrollmentRule)
+def enroll_rule(sender, instance, **kwargs):
+    if instance.is_active:
+        run_after_commit(enroll_community_by_id, instance.community_id)
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def invalidate_membership_cache(sender, instance, **kwargs):
+    
+    '''joins, leaves and role changes drop the member's cached membership map'''
+    
+    invalidate_memberships_after_commit([instance.user_id])
+
+
+@receiver(pre_delete, sender=User)
+@receiver(pre_delete, sender=CommunityGroup)
+def remember_deleting(sender, instance, **kwargs):
+    
+    '''the collector sends every pre_delete before it deletes the cascaded memberships'''
+    
+    get_deleting(sender).add(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=CommunityGroup)
+def forget_deleting(sender, instance, **kwargs):
+    get_deleting(sender).discard(instance.pk)
+
+
+@receiver(post_save, sender=CommunityMembership)
+def log_join(sender, instance, created, raw=False, **kwargs):
+    
+    '''
+    Log a join for every membership created, whatever created it, so the
+    rollup's joins match the memberships (bulk enrollment logs its own)
+    '''
+    
+    if created and not raw:
+        CommunityMembershipEvent.objects.create(community_id=instance.community_id, user_id=instance.user_id, event='join')
+
+
+@receiver(post_delete, sender=CommunityMembership)
+def log_leave(sender, instance, **kwargs):
+    
+    '''
+    Log a leave for every membership deleted: leave_community, the admin, a
+    deleted user's cascade. A deleted community's log goes with it, so its
+    memberships log nothing; a deleted user's leave is logged without the user
+    '''
+    
+    if instance.community_id in get_deleting(CommunityGroup):
+        return
+    
+    user_id = None if instance.user_id in get_deleting(User) else instance.user_id
+    CommunityMembershipEvent.objects.create(community_id=instance.community_id, user_id=user_id, event='leave')
+
+
+@receiver(post_delete, sender=CommunityPost)
+def recount_deleted_post(sender, instance, **kwargs):
+    
+    '''the rollup only finds days from new rows, so a deleted post's day is queued for a recount'''
+    
+    queue_recount([(instance.community_id, instance.created_at)])
@@ -1,3 +1,402 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import pre_delete, post_delete
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from portal.models import UserProfile
+from .models import (
+    CommunityGroup,
+    CommunityMembership,
+    CommunityMembershipEvent,
+    CommunityEnrollmentRule,
+    CommunityPost,
+    CommunityDailyStats,
+    CommunityRollupWatermark
+)
+from .rollups import rollup_community_stats
+from .serializers import CommunityGroupCreateSerializer
+from .utils import adjust_member_count, join_community, leave_community
+
+
+def make_user(username, is_active=True, **profile):
+    user = User.objects.create_user(username, password='pw', is_active=is_active)
+    UserProfile.objects.create(user=user, **{
+        'firstname': username,
+        'lastname': 'test',
+        'birth_date': date(2000, 1, 1),
+        'gender': 'female',
+        'role': 'student',
+        'department': 'ccis',
+        'course': 'bscs',
+        **profile
+    })
+    return user
+
+
+def make_community(name, owner):
+    return CommunityGroup.objects.create(name=name, description=name, created_by=owner)
+
+
+def make_post(community, author, minutes, **fields):
+    post = CommunityPost.objects.create(community=community, author=author, title='post', content='c', **fields)
+    # created_at is auto_now_add; pin it so ordering is explicit
+    created_at = timezone.now() - timedelta(days=1) + timedelta(minutes=minutes)
+    CommunityPost.objects.filter(pk=post.pk).update(created_at=created_at)
+    post.created_at = created_at
+    return post
+
+
+class PageTestCase(APITestCase):
+
+    def get_page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, data, key='posts'):
+        return [item['id'] for item in data[key]]
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class EnrollmentSignalTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user('student')
+        self.profile = UserProfile.objects.get(user=self.user)
+
+    def save_scheduling(self, obj, **kwargs):
+        with mock.patch('community.signals.enroll_users') as enroll_users:
+            with self.captureOnCommitCallbacks(execute=True):
+                obj.save(**kwargs)
+        return enroll_users
+
+    def test_unrelated_profile_edit_does_not_enroll(self):
+        self.profile.firstname = 'renamed'
+        self.assertFalse(self.save_scheduling(self.profile).called)
+
+    def test_update_fields_without_rule_fields_skips_the_check(self):
+        with self.assertNumQueries(1):
+            enroll_users = self.save_scheduling(self.profile, update_fields=['firstname'])
+        self.assertFalse(enroll_users.called)
+
+    def test_course_change_enrolls_active_user(self):
+        self.profile.course = 'bsit'
+        self.save_scheduling(self.profile).assert_called_once_with([self.user.id])
+
+    def test_course_change_of_inactive_user_does_not_enroll(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.profile.course = 'bsit'
+        self.assertFalse(self.save_scheduling(self.profile).called)
+
+    def test_full_save_of_active_user_does_not_enroll(self):
+        self.user.first_name = 'renamed'
+        self.assertFalse(self.save_scheduling(self.user).called)
+
+    def test_activation_enrolls_matching_user(self):
+        owner = make_user('owner', course='bsit')
+        community = make_community('CCIS', owner)
+        CommunityEnrollmentRule.objects.create(community=community, department='ccis')
+        pending = make_user('pending', is_active=False)
+
+        pending.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            pending.save()
+
+        self.assertTrue(CommunityMembership.objects.filter(community=community, user=pending).exists())
+        community.refresh_from_db()
+        self.assertEqual(community.member_count, CommunityMembership.objects.filter(community=community).count())
+
+
+class MembershipEventTests(TestCase):
+
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.member = make_user('member')
+        self.community = make_community('Events', self.owner)
+
+    def events(self, **filters):
+        return list(CommunityMembershipEvent.objects.filter(**filters).order_by('id').values_list('event', 'user_id'))
+
+    def test_join_and_leave_are_logged_once(self):
+        membership = join_community(self.member, self.community)
+        leave_community(membership)
+        self.assertEqual(self.events(community=self.community), [('join', self.member.id), ('leave', self.member.id)])
+
+    def test_delete_outside_leave_community_is_logged(self):
+        membership = CommunityMembership.objects.create(user=self.member, community=self.community)
+        membership.delete()
+        self.assertEqual(self.events(community=self.community), [('join', self.member.id), ('leave', self.member.id)])
+
+    def test_deleted_user_logs_leave_without_the_user(self):
+        membership = join_community(self.member, self.community)
+
+        # as the collector does when a user delete cascades to memberships
+        pre_delete.send(sender=User, instance=self.member)
+        membership.delete()
+        post_delete.send(sender=User, instance=self.member)
+
+        self.assertEqual(self.events(community=self.community), [('join', self.member.id), ('leave', None)])
+
+    def test_deleted_community_logs_nothing(self):
+        join_community(self.member, self.community)
+        self.community.delete()
+        connection.check_constraints()
+        self.assertEqual(self.events(), [])
+
+
+class MemberCountTests(TestCase):
+
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.community = make_community('Counts', self.owner)
+
+    def test_join_and_leave_keep_the_count(self):
+        members = [join_community(make_user(f'member{i}'), self.community) for i in range(3)]
+        self.assertIsNone(join_community(members[0].user, self.community))
+        self.assertEqual(self.community.member_count, 3)
+
+        leave_community(members[0])
+        self.assertFalse(leave_community(members[0]))
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.member_count, 2)
+
+    def test_count_floors_at_zero(self):
+        membership = join_community(make_user('member'), self.community)
+        CommunityGroup.objects.filter(pk=self.community.pk).update(member_count=0)
+
+        leave_community(membership)
+        adjust_member_count(self.community, -5)
+
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.member_count, 0)
+
+    def test_edit_does_not_overwrite_a_concurrent_count(self):
+        # loaded before the join, saved after it, as in an overlapping PUT
+        stale = CommunityGroup.objects.get(pk=self.community.pk)
+        join_community(make_user('member'), self.community)
+
+        serializer = CommunityGroupCreateSerializer(stale, data={'description': 'An edited description'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.community.refresh_from_db()
+        self.assertEqual((self.community.description, self.community.member_count), ('An edited description', 1))
+
+    def test_reconcile_repairs_drift(self):
+        join_community(make_user('member'), self.community)
+        CommunityGroup.objects.filter(pk=self.community.pk).update(member_count=7)
+
+        call_command('reconcile_member_counts', stdout=StringIO())
+
+        self.community.refresh_from_db()
+        self.assertEqual(self.community.member_count, 1)
+
+
+class CommunityPostListTests(PageTestCase):
+
+    def setUp(self):
+        self.member = make_user('member')
+        self.community = make_community('Posts', self.member)
+        join_community(self.member, self.community)
+        self.client.force_authenticate(self.member)
+        self.url = f'/api/v1/community/groups/{self.community.pk}/posts/'
+
+    def test_pinned_head_then_stable_cursor_pages(self):
+        posts = [make_post(self.community, self.member, minutes) for minutes in range(5)]
+        pinned = make_post(self.community, self.member, -10, is_pinned=True)
+        newest_first = [post.id for post in reversed(posts)]
+
+        first = self.get_page(self.url, page_size=2)
+        self.assertEqual(self.ids(first), [pinned.id, *newest_first[:2]])
+        self.assertEqual(first['page_count'], 3)
+
+        # a new post between pages shifts nothing, and the pinned head is not repeated
+        make_post(self.community, self.member, 60)
+        second = self.get_page(first['next'])
+        third = self.get_page(second['next'])
+
+        self.assertEqual(self.ids(second), newest_first[2:4])
+        self.assertEqual(self.ids(third), newest_first[4:])
+        self.assertIsNone(third['next'])
+
+    def test_non_member_is_forbidden(self):
+        self.client.force_authenticate(make_user('outsider'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class CommunityFeedTests(PageTestCase):
+
+    url = '/api/v1/community/posts/feed/'
+
+    def setUp(self):
+        self.member = make_user('member')
+        self.client.force_authenticate(self.member)
+
+    def make_communities(self, count, posts_each=3):
+        communities = [make_community(f'Feed {i}', self.member) for i in range(count)]
+        for index, community in enumerate(communities):
+            join_community(self.member, community)
+            for minutes in range(posts_each):
+                # interleaved across communities, with equal timestamps between pairs
+                make_post(community, self.member, minutes * 10 + index // 2)
+        return communities
+
+    def walk(self, **params):
+        ids = []
+        data = self.get_page(self.url, **params)
+        while True:
+            ids += self.ids(data)
+            if not data['next']:
+                return ids
+            data = self.get_page(data['next'])
+
+    def test_merged_feed_matches_the_single_query_order(self):
+        communities = self.make_communities(4)
+        other = make_community('Not joined', make_user('owner'))
+        make_post(other, self.member, 5)
+        inactive = communities[0]
+        CommunityGroup.objects.filter(pk=inactive.pk).update(is_active=False)
+
+        expected = list(CommunityPost.objects.filter(
+            community__in=communities[1:]
+        ).order_by('-created_at', '-id').values_list('id', flat=True))
+
+        with self.settings(COMMUNITY_FEED_MERGE_THRESHOLD=100):
+            self.assertEqual(self.walk(page_size=4), expected)
+        with self.settings(COMMUNITY_FEED_MERGE_THRESHOLD=0):
+            self.assertEqual(self.walk(page_size=4), expected)
+
+    @override_settings(COMMUNITY_FEED_MERGE_THRESHOLD=0)
+    def test_merged_page_queries_do_not_grow_per_community_with_union(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.get_page(self.url, page_size=5)
+            return len(queries)
+
+        self.make_communities(3, posts_each=1)
+        few = count_queries()
+        for i in range(3):
+            join_community(self.member, make_community(f'More {i}', self.member))
+        many = count_queries()
+
+        # one UNION ALL where supported, one seek per community elsewhere
+        per_community = 0 if connection.features.supports_slicing_ordering_in_compound else 1
+        self.assertEqual(many - few, 3 * per_community)
+
+
+class CommunityMembersListTests(PageTestCase):
+
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.community = make_community('Members', self.owner)
+        self.url = f'/api/v1/community/groups/{self.community.pk}/members/'
+        self.memberships = [
+            join_community(make_user(f'member{i}'), self.community, role='moderator' if i % 2 else 'member')
+            for i in range(5)
+        ]
+        # joined_at ties, so pages split on the id tiebreaker
+        CommunityMembership.objects.update(joined_at=timezone.now())
+        self.client.force_authenticate(self.owner)
+
+    def test_cursor_pages_are_stable_across_joins(self):
+        newest_first = [membership.id for membership in reversed(self.memberships)]
+
+        first = self.get_page(self.url, page_size=2)
+        join_community(make_user('late'), self.community)
+        second = self.get_page(first['next'])
+        third = self.get_page(second['next'])
+
+        self.assertEqual(
+            self.ids(first, 'members') + self.ids(second, 'members') + self.ids(third, 'members'),
+            newest_first
+        )
+        self.assertEqual([first['page_count'], third['member_count']], [2, 6])
+
+    def test_role_filter(self):
+        data = self.get_page(self.url, role='moderator')
+        self.assertEqual(
+            self.ids(data, 'members'),
+            [membership.id for membership in reversed(self.memberships) if membership.role == 'moderator']
+        )
+        self.assertEqual(self.client.get(self.url, {'role': 'owner'}).status_code, 400)
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.member = make_user('member')
+        self.community = make_community('Rollup', self.owner)
+
+    def rollup(self, **kwargs):
+        return rollup_community_stats(lag_seconds=0, **kwargs)
+
+    def stats(self):
+        return {
+            row.date: (row.posts, row.active_posters, row.joins, row.leaves)
+            for row in CommunityDailyStats.objects.filter(community=self.community)
+        }
+
+    def post(self, author, when):
+        post = CommunityPost.objects.create(community=self.community, author=author, title='post', content='c')
+        CommunityPost.objects.filter(pk=post.pk).update(created_at=when)
+        post.created_at = when
+        return post
+
+    def test_incremental_runs_recount_whole_days(self):
+        now = timezone.now()
+        today = timezone.localdate(now)
+        self.post(self.owner, now - timedelta(minutes=5))
+        membership = join_community(self.member, self.community)
+
+        self.rollup()
+        self.assertEqual(self.stats(), {today: (1, 1, 1, 0)})
+        self.assertEqual(CommunityRollupWatermark.objects.count(), 2)
+
+        self.post(self.member, timezone.now())
+        leave_community(membership)
+
+        self.rollup()
+        self.assertEqual(self.stats(), {today: (2, 2, 1, 1)})
+
+        # re-running (the overlap rescans today) rewrites the same counts
+        self.rollup()
+        self.assertEqual(self.stats(), {today: (2, 2, 1, 1)})
+
+    def test_deleted_post_recounts_its_day(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        post = self.post(self.owner, yesterday)
+        self.rollup()
+
+        post.delete()
+        self.rollup()
+
+        self.assertEqual(self.stats(), {timezone.localdate(yesterday): (0, 0, 0, 0)})
+
+    def test_late_commit_inside_the_overlap_is_counted(self):
+        self.rollup()
+        watermark = CommunityRollupWatermark.objects.get(source='posts').processed_until
+
+        # committed after the run, but stamped before its watermark
+        late = watermark - timedelta(minutes=5)
+        self.post(self.owner, late)
+        self.rollup(overlap_seconds=600)
+
+        self.assertEqual(self.stats(), {timezone.localdate(late): (1, 1, 0, 0)})
+
+    def test_rebuild_drops_days_with_no_rows_left(self):
+        day = timezone.now() - timedelta(days=2)
+        self.rollup()
+        CommunityDailyStats.objects.create(community=self.community, date=timezone.localdate(day), posts=9)
+
+        self.rollup(rebuild=True)
+
+        self.assertEqual(self.stats(), {})
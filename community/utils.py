@@ -0,0 +1,97 @@
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from portal.utils import get_following_ids
+from .models import CommunityGroup, CommunityMembership
+from .permissions import get_cached_memberships, get_community_permissions
+
+
+def adjust_member_count(community, delta):
+    
+    '''
+    Apply delta to community.member_count in the database with an F()
+    expression, writing only that column, and reload the new value.
+    The count never goes below zero, even if the stored value had drifted
+    '''
+    
+    community.member_count = Greatest(F('member_count') + delta, 0)
+    community.save(update_fields=['member_count'])
+    community.refresh_from_db(fields=['member_count'])
+
+
+def join_community(user, community, role='member'):
+    
+    '''
+    Create the membership and increment member_count in one transaction (the
+    join is logged by community/signals.py). Returns the membership, or None
+    if the user was already a member
+    '''
+    
+    try:
+        with transaction.atomic():
+            # lock the community before inserting, in the same order as
+            # enroll_community, so the two cannot deadlock
+            CommunityGroup.objects.select_for_update().only('id').get(pk=community.pk)
+            membership = CommunityMembership.objects.create(user=user, community=community, role=role)
+            adjust_member_count(community, 1)
+    except IntegrityError:
+        return None
+    
+    return membership
+
+
+def leave_community(membership):
+    
+    '''
+    Delete the membership and decrement member_count in one transaction
+    (the leave is logged by community/signals.py)
+    '''
+    
+    community = membership.community
+    with transaction.atomic():
+        deleted, _ = CommunityMembership.objects.filter(pk=membership.pk).delete()
+        if not deleted:
+            return False
+        adjust_member_count(community, -1)
+    
+    return True
+
+
+def get_membership_map(user, community_ids=None):
+
+    '''
+    The user's memberships as {community_id: role}, from the membership cache
+    Pass community_ids to restrict it to the communities being rendered
+    '''
+
+    memberships = get_cached_memberships(user)
+    if community_ids is not None:
+        community_ids = set(community_ids)
+        return {community_id: role for community_id, role in memberships.items() if community_id in community_ids}
+    return dict(memberships)
+
+
+def get_community_context(request, communities, memberships=None):
+
+    '''
+    Serializer context for a page of communities: preloads the viewer's roles
+    into the request's community permissions and finds which creators they
+    follow, so CommunityGroupSerializer makes no per-community queries.
+    Pass memberships when the full {community_id: role} map is already loaded.
+    communities should select_related('created_by__profile')
+    '''
+
+    permissions = get_community_permissions(request)
+    if memberships is not None:
+        permissions.seed(memberships, complete=True)
+    else:
+        permissions.load(community.id for community in communities)
+
+    creator_ids = {community.created_by_id for community in communities}
+    following_ids = get_following_ids(request.user, creator_ids) if request.user.is_authenticated else set()
+
+    return {
+        'request': request,
+        'following_ids': following_ids
+    }
@@ -1,18 +1,37 @@
+from datetime import timedelta
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Q
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
 
-from .models import CommunityGroup, CommunityMembership, CommunityPost
+from stream.pagination import KeysetPagination
+from portal.utils import get_following_ids
+from .models import CommunityGroup, CommunityMembership, CommunityPost, CommunityDailyStats
 from .serializers import (
     CommunityGroupSerializer,
+    CommunityDiscoverySerializer,
     CommunityGroupCreateSerializer,
     CommunityMembershipSerializer,
+    CommunityMemberSerializer,
     CommunityPostSerializer,
     CommunityPostCreateSerializer
 )
+from .permissions import get_community_permissions
+from .discovery import search_communities
+from .rollups import get_rollup_freshness
+from .utils import (
+    get_membership_map,
+    get_community_context,
+    join_community,
+    leave_community
+)
 
 class CommunityGroupListView(APIView):
     
@@ -21,10 +40,66 @@ class CommunityGroupListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        communities = CommunityGroup.objects.filter(is_active=True)
-        serializer = CommunityGroupSerializer(communities, many=True, context={'request': request})
+        communities = list(
+            CommunityGroup.objects.filter(is_active=True).select_related('created_by__profile')
+        )
+        serializer = CommunityGroupSerializer(
+            communities,
+            many=True,
+            context=get_community_context(request, communities)
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
     
+class CommunityDiscoveryView(APIView):
+    
+    '''
+    API endpoint for discovering communities
+    ?q= full-text search over name and description, ?visibility=public|private,
+    ?limit= caps the results. Ranked by text relevance plus recent activity
+    (see community.discovery)
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 50
+    
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+        
+        communities = CommunityGroup.objects.filter(is_active=True)
+        
+        visibility = request.query_params.get('visibility')
+        if visibility:
+            if visibility not in ('public', 'private'):
+                return Response({
+                    'error': 'visibility must be public or private'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            communities = communities.filter(is_private=visibility == 'private')
+        
+        communities = search_communities(communities, request.query_params.get('q', '').strip())
+        communities = list(
+            communities.select_related('created_by__profile').annotate(
+                recent_posts=Coalesce(F('activity__recent_posts'), Value(0)),
+                member_growth=Coalesce(F('activity__member_growth'), Value(0))
+            )[:limit]
+        )
+        
+        serializer = CommunityDiscoverySerializer(
+            communities,
+            many=True,
+            context=get_community_context(request, communities)
+        )
+        return Response({
+            'count': len(communities),
+            'communities': serializer.data
+        }, status=status.HTTP_200_OK)
+    
 class CommunityGroupCreateView(APIView):
     
     '''API endpoint for creating community group - Only admins can create'''
@@ -42,16 +117,11 @@ class CommunityGroupCreateView(APIView):
         serializer = CommunityGroupCreateSerializer(data=request.data)
         
         if serializer.is_valid():
-            community = serializer.save(created_by=request.user)
-            
-            # Automatically make creator an admin member
-            CommunityMembership.objects.create(
-                user=request.user,
-                community=community,
-                role='admin'
-            )
-            community.member_count = 1
-            community.save()
+            with transaction.atomic():
+                community = serializer.save(created_by=request.user)
+                
+                # Automatically make creator an admin member
+                join_community(request.user, community, role='admin')
             
             response_serializer = CommunityGroupSerializer(community, context={'request': request})
             return Response({
@@ -70,7 +140,7 @@ class CommunityGroupDetailView(APIView):
     
     def get_object(self, pk):
         try:
-            return CommunityGroup.objects.get(pk=pk, is_active=True)
+            return CommunityGroup.objects.select_related('created_by__profile').get(pk=pk, is_active=True)
         except CommunityGroup.DoesNotExist:
             return None
     
@@ -81,7 +151,7 @@ class CommunityGroupDetailView(APIView):
                 'error': 'Community not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = CommunityGroupSerializer(community, context={'request': request})
+        serializer = CommunityGroupSerializer(community, context=get_community_context(request, [community]))
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     def put(self, request, pk):
@@ -122,7 +192,7 @@ class CommunityGroupDetailView(APIView):
             }, status=status.HTTP_403_FORBIDDEN)
         
         community.is_active = False
-        community.save()
+        community.save(update_fields=['is_active', 'updated_at'])
         return Response({
             'message': 'Community deleted'
         }, status=status.HTTP_200_OK)
@@ -143,23 +213,13 @@ class CommunityMembershipView(APIView):
                 'error': 'Community not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if already a member
-        if CommunityMembership.objects.filter(user=request.user, community=community).exists():
+        # Create membership and update member count (None if already a member)
+        membership = join_community(request.user, community)
+        if membership is None:
             return Response({
                 'error': 'You are already a member of this community'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create membership
-        membership = CommunityMembership.objects.create(
-            user=request.user,
-            community=community,
-            role='member'
-        )
-        
-        # Update member count
-        community.member_count += 1
-        community.save()
-        
         return Response({
             'message': f'Successfully joined {community.name}',
             'membership': CommunityMembershipSerializer(membership).data
@@ -194,19 +254,89 @@ class CommunityMembershipView(APIView):
                     'error': 'Cannot leave - you are the last admin'
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        membership.delete()
-        
-        # Update member count
-        community.member_count = max(0, community.member_count - 1)
-        community.save()
+        # Delete membership and update member count
+        leave_community(membership)
         
         return Response({
             'message': f'Successfully left {community.name}'
         }, status=status.HTTP_200_OK)
         
+class CommunityStatsView(APIView):
+    
+    '''
+    API endpoint for a community's activity dashboard - admins and moderators only
+    Daily posts, active posters, joins and leaves for the last ?days= days
+    (default 30), read only from the daily rollups
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    default_days = 30
+    max_days = 365
+    
+    def get(self, request, pk):
+        try:
+            community = CommunityGroup.objects.get(pk=pk, is_active=True)
+        except CommunityGroup.DoesNotExist:
+            return Response({
+                'error': 'Community not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if not get_community_permissions(request).can_moderate(community.id) and not request.user.is_superuser:
+            return Response({
+                'error': 'Only admins and moderators can view community stats'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            days = int(request.query_params.get('days', self.default_days))
+        except ValueError:
+            return Response({
+                'error': 'days must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        days = max(1, min(days, self.max_days))
+        
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        rows = {
+            row['date']: row
+            for row in CommunityDailyStats.objects.filter(
+                community=community,
+                date__gte=start
+            ).values('date', 'posts', 'active_posters', 'joins', 'leaves')
+        }
+        
+        # fill days without activity so the series is continuous
+        series = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = rows.get(day, {})
+            series.append({
+                'date': day,
+                'posts': row.get('posts', 0),
+                'active_posters': row.get('active_posters', 0),
+                'joins': row.get('joins', 0),
+                'leaves': row.get('leaves', 0)
+            })
+        
+        totals = {
+            field: sum(day[field] for day in series)
+            for field in ('posts', 'joins', 'leaves')
+        }
+        totals['net_growth'] = totals['joins'] - totals['leaves']
+        
+        return Response({
+            'community': community.id,
+            'member_count': community.member_count,
+            'days': series,
+            'totals': totals,
+            'processed_until': get_rollup_freshness()
+        }, status=status.HTTP_200_OK)
+        
 class CommunityMembersListView(APIView):
     
-    '''API endpoint for listing community members'''
+    '''
+    API endpoint for listing community members, newest first and cursor paginated
+    ?role= filters by member/moderator/admin
+    '''
     
     permission_classes = [IsAuthenticated]
     
@@ -219,22 +349,38 @@ class CommunityMembersListView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check if user is a member
-        is_member = CommunityMembership.objects.filter(
-            user=request.user,
-            community=community
-        ).exists()
+        is_member = get_community_permissions(request).is_member(community.id)
         
         if not is_member and community.is_private:
             return Response({
                 'error': 'This is a private community'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        members = CommunityMembership.objects.filter(community=community)
-        serializer = CommunityMembershipSerializer(members, many=True)
+        members = CommunityMembership.objects.filter(
+            community=community
+        ).select_related('user__profile')
+        
+        role = request.query_params.get('role')
+        if role:
+            if role not in dict(CommunityMembership.ROLE_CHOICES):
+                return Response({
+                    'error': 'Invalid role'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            members = members.filter(role=role)
+        
+        paginator = KeysetPagination(ordering=('-joined_at', '-id'))
+        page = paginator.paginate_queryset(members, request)
+        
+        serializer = CommunityMemberSerializer(page, many=True, context={
+            'request': request,
+            'following_ids': get_following_ids(request.user, {member.user_id for member in page})
+        })
         
         return Response({
-            'count': members.count(),
-            'members': serializer.data
+            'page_count': len(page),
+            'member_count': community.member_count,
+            'members': serializer.data,
+            'next': paginator.get_next_link()
         }, status=status.HTTP_200_OK)
         
 class UpdateMemberRoleView(APIView):
@@ -252,13 +398,9 @@ class UpdateMemberRoleView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check if requester is admin
-        requester_membership = CommunityMembership.objects.filter(
-            user=request.user,
-            community=community,
-            role='admin'
-        ).first()
+        is_admin = get_community_permissions(request).role(community.id) == 'admin'
         
-        if not requester_membership and not request.user.is_superuser:
+        if not is_admin and not request.user.is_superuser:
             return Response({
                 'error': 'Only admins can update member roles'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -287,7 +429,10 @@ class UpdateMemberRoleView(APIView):
         
 class CommunityPostListView(APIView):
     
-    '''API endpoint for listing posts in a community group'''
+    '''
+    API endpoint for listing posts in a community group
+    Pinned posts come first on the first page, the rest are cursor paginated
+    '''
     
     permission_classes = [IsAuthenticated]
     
@@ -299,21 +444,35 @@ class CommunityPostListView(APIView):
                 'error': 'Community not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if user is a member
-        is_member = CommunityMembership.objects.filter(
-            user=request.user,
-            community=community
-        ).exists()
+        # Check if user is a member (the serializer reuses the loaded role)
+        is_member = get_community_permissions(request).is_member(community.id)
         
         if not is_member:
             return Response({
                 'error': 'You must be a member to view posts'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        posts = CommunityPost.objects.filter(community=community)
-        serializer = CommunityPostSerializer(posts, many=True, context={'request': request})
+        posts = CommunityPost.objects.filter(
+            community=community
+        ).select_related('author__profile', 'community')
         
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # regular posts are keyset paged; pinned posts head the first page
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(posts.filter(is_pinned=False), request)
+        if not request.query_params.get(paginator.cursor_query_param):
+            pinned = posts.filter(is_pinned=True).order_by('-created_at', '-id')[:paginator.max_page_size]
+            page = list(pinned) + page
+        
+        serializer = CommunityPostSerializer(page, many=True, context={
+            'request': request,
+            'following_ids': get_following_ids(request.user, {post.author_id for post in page})
+        })
+        
+        return Response({
+            'page_count': len(page),
+            'posts': serializer.data,
+            'next': paginator.get_next_link()
+        }, status=status.HTTP_200_OK)
     
 class CommunityPostCreateView(APIView):
     
@@ -329,10 +488,7 @@ class CommunityPostCreateView(APIView):
             community_id = serializer.validated_data.get('community').id
             
             # Check if user is a member
-            is_member = CommunityMembership.objects.filter(
-                user=request.user,
-                community_id=community_id
-            ).exists()
+            is_member = get_community_permissions(request).is_member(community_id)
             
             if not is_member:
                 return Response({
@@ -360,7 +516,7 @@ class CommunityPostDetailView(APIView):
     
     def get_object(self, pk):
         try:
-            return CommunityPost.objects.get(pk=pk)
+            return CommunityPost.objects.select_related('author__profile', 'community').get(pk=pk)
         except CommunityPost.DoesNotExist:
             return None
     
@@ -372,10 +528,7 @@ class CommunityPostDetailView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check if user is a member
-        is_member = CommunityMembership.objects.filter(
-            user=request.user,
-            community=post.community
-        ).exists()
+        is_member = get_community_permissions(request).is_member(post.community_id)
         
         if not is_member:
             return Response({
@@ -393,19 +546,15 @@ class CommunityPostDetailView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check permission
-        membership = CommunityMembership.objects.filter(
-            user=request.user,
-            community=post.community
-        ).first()
+        permissions = get_community_permissions(request)
         
-        if not membership:
+        if not permissions.is_member(post.community_id):
             return Response({
                 'error': 'You are not a member of this community'
             }, status=status.HTTP_403_FORBIDDEN)
         
         # Author or moderator/admin can edit
-        can_edit = (post.author == request.user or 
-                   membership.role in ['moderator', 'admin'])
+        can_edit = permissions.can_edit_post(post)
         
         if not can_edit:
             return Response({
@@ -431,19 +580,15 @@ class CommunityPostDetailView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check permission
-        membership = CommunityMembership.objects.filter(
-            user=request.user,
-            community=post.community
-        ).first()
+        permissions = get_community_permissions(request)
         
-        if not membership:
+        if not permissions.is_member(post.community_id):
             return Response({
                 'error': 'You are not a member of this community'
             }, status=status.HTTP_403_FORBIDDEN)
         
         # Author or moderator/admin can delete
-        can_delete = (post.author == request.user or 
-                     membership.role in ['moderator', 'admin'])
+        can_delete = permissions.can_delete_post(post)
         
         if not can_delete:
             return Response({
@@ -462,9 +607,57 @@ class UserCommunitiesView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        memberships = CommunityMembership.objects.filter(user=request.user)
-        community_ids = memberships.values_list('community_id', flat=True)
-        communities = CommunityGroup.objects.filter(id__in=community_ids, is_active=True)
+        # the membership map doubles as the list of joined communities
+        memberships = get_membership_map(request.user)
+        communities = list(
+            CommunityGroup.objects.filter(
+                id__in=list(memberships),
+                is_active=True
+            ).select_related('created_by__profile')
+        )
+        
+        serializer = CommunityGroupSerializer(
+            communities,
+            many=True,
+            context=get_community_context(request, communities, memberships=memberships)
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+class CommunityFeedView(APIView):
+    
+    '''
+    API endpoint for the merged feed of posts from every community the user belongs to
+    Newest first and cursor paginated. Small membership sets are read with one
+    query; above COMMUNITY_FEED_MERGE_THRESHOLD each community is read as its own
+    index range scan (one UNION ALL on PostgreSQL) and the streams are merged
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        memberships = dict(
+            CommunityMembership.objects.filter(
+                user=request.user,
+                community__is_active=True
+            ).values_list('community_id', 'role')
+        )
         
-        serializer = CommunityGroupSerializer(communities, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        posts = CommunityPost.objects.select_related('author__profile', 'community')
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        
+        if len(memberships) > getattr(settings, 'COMMUNITY_FEED_MERGE_THRESHOLD', 10):
+            page = paginator.paginate_merged(posts, 'community_id', list(memberships), request)
+        else:
+            page = paginator.paginate_queryset(posts.filter(community_id__in=list(memberships)), request)
+        
+        get_community_permissions(request).seed(memberships, complete=True)
+        serializer = CommunityPostSerializer(page, many=True, context={
+            'request': request,
+            'following_ids': get_following_ids(request.user, {post.author_id for post in page})
+        })
+        
+        return Response({
+            'page_count': len(page),
+            'posts': serializer.data,
+            'next': paginator.get_next_link()
+        }, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationReadMarker
 
 
 @admin.register(Notification)
@@ -20,3 +20,10 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('is_read', 'created_at')
         }),
     )
+
+
+@admin.register(NotificationReadMarker)
+class NotificationReadMarkerAdmin(admin.ModelAdmin):
+    list_display = ['user', 'read_until', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
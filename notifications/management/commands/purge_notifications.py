@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from notifications.models import Notification
+
+
+class Command(BaseCommand):
+
+    '''
+    Enforce the notification retention policy
+    Rows are deleted in small primary-key ordered batches with a pause in
+    between, so a purge never holds long locks on the notifications table
+    '''
+
+    help = 'Delete notifications that are past the retention policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--read-days',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_READ_RETENTION_DAYS', 30),
+            help='Delete read notifications older than this many days (0 disables)'
+        )
+        parser.add_argument(
+            '--max-days',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_MAX_RETENTION_DAYS', 180),
+            help='Delete any notification older than this many days (0 disables)'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows deleted per batch')
+        parser.add_argument('--sleep', type=float, default=0.5, help='Seconds to pause between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be deleted')
+
+    def get_expired_filter(self, now, read_days, max_days):
+        expired = Q(pk__in=[])
+        if read_days > 0:
+            # read either explicitly or through the recipient's read watermark
+            is_read = Q(is_read=True) | Q(created_at__lte=F('recipient__notification_read_marker__read_until'))
+            expired |= is_read & Q(created_at__lt=now - timedelta(days=read_days))
+        if max_days > 0:
+            expired |= Q(created_at__lt=now - timedelta(days=max_days))
+        return expired
+
+    def handle(self, *args, **options):
+        read_days = options['read_days']
+        max_days = options['max_days']
+        batch_size = options['batch_size']
+
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if read_days <= 0 and max_days <= 0:
+            self.stdout.write('Both retention rules are disabled, nothing to do')
+            return
+
+        started = time.monotonic()
+        expired = Notification.objects.filter(
+            self.get_expired_filter(timezone.now(), read_days, max_days)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} notifications would be removed')
+            return
+
+        removed = 0
+        batches = 0
+        last_id = 0
+
+        while True:
+            ids = list(
+                expired.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            deleted, _ = Notification.objects.filter(id__in=ids).delete()
+            removed += deleted
+            batches += 1
+            last_id = ids[-1]
+
+            if len(ids) < batch_size:
+                break
+            time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {removed} notifications in {batches} batch(es), took {elapsed:.2f}s'
+        ))
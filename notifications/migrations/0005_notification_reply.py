@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_dedupe_key'),
+        ('threads', '0005_threadcommentreply_threadcommentlike_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='reply',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='threads.threadcommentreply'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('like', 'Like'), ('comment', 'Comment'), ('follow', 'Follow'), ('new_post', 'New Post'), ('like_comment', 'Like Comment'), ('like_reply', 'Like Reply'), ('reply_comment', 'Reply Comment'), ('announcement', 'Announcement')], max_length=20),
+        ),
+    ]
@@ -56,8 +56,46 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # "<type>:<target id>" for events that can repeat (likes, follows);
+    # unique per recipient/sender so a repeat refreshes the existing row
+    dedupe_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'sender', 'dedupe_key'],
+                name='notif_unique_dedupe_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_created_idx'),
+            models.Index(
+                fields=['recipient', '-created_at', '-id'],
+                name='notif_recipient_unread_idx',
+                condition=models.Q(is_read=False)
+            ),
+        ]
         
     def __str__(self):
         return f"{self.notification_type} - {self.recipient.username} from {self.sender.username}"
+
+
+class NotificationReadMarker(models.Model):
+    
+    '''
+    Per-user read watermark: every notification created at or before
+    read_until counts as read, so "mark all as read" is a single row write
+    '''
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_read_marker'
+    )
+    read_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} read until {self.read_until}"
@@ -9,6 +9,7 @@ class NotificationSerializer(serializers.ModelSerializer):
     sender_profile_image = serializers.SerializerMethodField()
     thread_title = serializers.CharField(source='thread.title', read_only=True, allow_null=True)
     thread_id = serializers.IntegerField(source='thread.id', read_only=True, allow_null=True)
+    is_read = serializers.SerializerMethodField()
     
     class Meta:
         model = Notification
@@ -31,22 +32,38 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['recipient', 'sender', 'created_at']
     
+    def get_is_read(self, obj):
+        
+        '''read explicitly or covered by the recipient's read watermark (context['read_until'])'''
+        
+        read_until = self.context.get('read_until')
+        return obj.is_read or bool(read_until and obj.created_at <= read_until)
+    
+    def get_sender_profile(self, obj):
+        
+        '''sender profile, preloaded by select_related('sender__profile') in list views'''
+        
+        return getattr(obj.sender, 'profile', None)
+    
     def get_sender_first_name(self, obj):
  
-        if hasattr(obj.sender, 'profile'):
-            return obj.sender.profile.firstname
+        profile = self.get_sender_profile(obj)
+        if profile:
+            return profile.firstname
         return obj.sender.first_name or ''
     
     def get_sender_last_name(self, obj):
     
-        if hasattr(obj.sender, 'profile'):
-            return obj.sender.profile.lastname
+        profile = self.get_sender_profile(obj)
+        if profile:
+            return profile.lastname
         return obj.sender.last_name or ''
     
     def get_sender_profile_image(self, obj):
   
-        if hasattr(obj.sender, 'profile') and obj.sender.profile.profile_image:
+        profile = self.get_sender_profile(obj)
+        if profile and profile.profile_image:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.sender.profile.profile_image.url)
+                return request.build_absolute_uri(profile.profile_image.url)
         return None
\ No newline at end of file
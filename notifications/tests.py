@@ -1,3 +1,164 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from threads.models import ThreadPost
+from .models import Notification
+from .utils import (
+    advance_read_marker,
+    create_comment_notification,
+    create_follow_notification,
+    create_like_notification
+)
+
+
+class NotificationTestCase(APITestCase):
+
+    def setUp(self):
+        self.recipient = User.objects.create_user('recipient', password='pw')
+        self.sender = User.objects.create_user('sender', password='pw')
+        self.client.force_authenticate(self.recipient)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def notify(self, minutes, **fields):
+        notification = Notification.objects.create(
+            recipient=self.recipient,
+            sender=self.sender,
+            notification_type='comment',
+            message='m',
+            **fields
+        )
+        # created_at is auto_now_add; pin it so ordering and ties are explicit
+        Notification.objects.filter(pk=notification.pk).update(created_at=self.start + timedelta(minutes=minutes))
+        notification.refresh_from_db()
+        return notification
+
+    def get_page(self, url=None, **params):
+        response = self.client.get(url or reverse('notification-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+
+class NotificationCursorTests(NotificationTestCase):
+
+    def ids(self, data):
+        return [notification['id'] for notification in data['notifications']]
+
+    def test_cursor_pages_are_stable_across_inserts(self):
+        notifications = [self.notify(minutes) for minutes in range(5)]
+        newest_first = [notification.id for notification in reversed(notifications)]
+
+        first = self.get_page(page_size=2)
+        self.assertEqual(self.ids(first), newest_first[:2])
+
+        # a newer notification arriving between pages shifts nothing
+        self.notify(10)
+        second = self.get_page(first['next'])
+        third = self.get_page(second['next'])
+
+        self.assertEqual(self.ids(second), newest_first[2:4])
+        self.assertEqual(self.ids(third), newest_first[4:])
+        self.assertIsNone(third['next'])
+
+    def test_equal_timestamps_are_neither_skipped_nor_repeated(self):
+        notifications = [self.notify(0) for _ in range(5)]
+
+        seen = []
+        data = self.get_page(page_size=2)
+        while True:
+            seen += self.ids(data)
+            if not data['next']:
+                break
+            data = self.get_page(data['next'])
+
+        self.assertEqual(seen, sorted((notification.id for notification in notifications), reverse=True))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('notification-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ReadMarkerTests(NotificationTestCase):
+
+    def unread_count(self):
+        return self.get_page()['unread_count']
+
+    def test_unread_count_follows_the_watermark(self):
+        notifications = [self.notify(minutes) for minutes in range(3)]
+        self.assertEqual(self.unread_count(), 3)
+
+        advance_read_marker(self.recipient, notifications[1].created_at)
+        self.assertEqual(self.unread_count(), 1)
+
+        # newer notifications are unread again
+        self.notify(10)
+        self.assertEqual(self.unread_count(), 2)
+
+    def test_watermark_never_moves_backwards(self):
+        notifications = [self.notify(minutes) for minutes in range(3)]
+
+        advance_read_marker(self.recipient, notifications[2].created_at)
+        advance_read_marker(self.recipient, notifications[0].created_at)
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_rows_marked_read_above_the_watermark_stay_read(self):
+        notifications = [self.notify(minutes) for minutes in range(3)]
+        advance_read_marker(self.recipient, notifications[0].created_at)
+        Notification.objects.filter(pk=notifications[2].pk).update(is_read=True)
+
+        data = self.get_page()
+        self.assertEqual(data['unread_count'], 1)
+        self.assertEqual(
+            [notification['is_read'] for notification in data['notifications']],
+            [True, False, True]
+        )
+
+    def test_mark_up_to_moves_the_watermark(self):
+        notifications = [self.notify(minutes) for minutes in range(3)]
+
+        response = self.client.patch(reverse('notification-bulk-mark-read'), {'up_to': notifications[1].id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.unread_count(), 1)
+
+        unread = self.get_page(unread='1')['notifications']
+        self.assertEqual([notification['id'] for notification in unread], [notifications[2].id])
+
+
+class NotificationDedupeTests(NotificationTestCase):
+
+    def test_repeated_follow_refreshes_one_notification(self):
+        create_follow_notification(self.sender, self.recipient)
+        first = Notification.objects.get(recipient=self.recipient)
+        Notification.objects.filter(pk=first.pk).update(is_read=True, created_at=self.start)
+
+        create_follow_notification(self.sender, self.recipient)
+
+        notification = Notification.objects.get(recipient=self.recipient)
+        self.assertEqual(notification.pk, first.pk)
+        self.assertFalse(notification.is_read)
+        self.assertGreater(notification.created_at, self.start)
+
+    def test_likes_dedupe_per_target(self):
+        threads = [
+            ThreadPost.objects.create(author=self.recipient, title=f'thread {i}', content='c')
+            for i in range(2)
+        ]
+
+        for thread in threads + threads:
+            create_like_notification(thread, self.sender)
+
+        self.assertCountEqual(
+            Notification.objects.values_list('dedupe_key', flat=True),
+            [f'like:{thread.id}' for thread in threads]
+        )
+
+    def test_comments_are_not_deduped(self):
+        thread = ThreadPost.objects.create(author=self.recipient, title='thread', content='c')
+
+        create_comment_notification(None, thread, self.sender)
+        create_comment_notification(None, thread, self.sender)
+
+        self.assertEqual(Notification.objects.filter(dedupe_key__isnull=True).count(), 2)
@@ -3,6 +3,7 @@ from .views import (
     NotificationListView,
     NotificationMarkAsReadView,
     NotificationMarkAllAsReadView,
+    NotificationBulkMarkAsReadView,
     NotificationDeleteView
 )
 
@@ -10,5 +11,6 @@ urlpatterns = [
     path('content/', NotificationListView.as_view(), name='notification-list'),
     path('content/<int:pk>/read/', NotificationMarkAsReadView.as_view(), name='notification-mark-read'),
     path('content/read-all/', NotificationMarkAllAsReadView.as_view(), name='notification-mark-all-read'),
+    path('content/read/', NotificationBulkMarkAsReadView.as_view(), name='notification-bulk-mark-read'),
     path('content/<int:pk>/delete/', NotificationDeleteView.as_view(), name='notification-delete'),
 ] 
\ No newline at end of file
@@ -1,6 +1,31 @@
-from .models import Notification
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification, NotificationReadMarker
 from portal.models import UserFollow
 
+
+def upsert_notification(recipient, sender, notification_type, target_id, **fields):
+    
+    '''
+    Create a notification for a repeatable event (like, follow), keyed on
+    (recipient, sender, type, target). Repeating the event refreshes the
+    existing row's timestamp and unread state instead of inserting a new one
+    '''
+    
+    fields.update({
+        'notification_type': notification_type,
+        'is_read': False,
+        'created_at': timezone.now(),
+    })
+    Notification.objects.update_or_create(
+        recipient=recipient,
+        sender=sender,
+        dedupe_key=f'{notification_type}:{target_id}',
+        defaults=fields
+    )
+
+
 def create_like_notification(thread, user):
     
     '''
@@ -10,10 +35,11 @@ def create_like_notification(thread, user):
     
     if thread.author != user:
         user_name = f"{user.profile.firstname} {user.profile.lastname}" if hasattr(user, 'profile') else user.username
-        Notification.objects.create(
+        upsert_notification(
             recipient=thread.author,
             sender=user,
             notification_type='like',
+            target_id=thread.id,
             thread=thread,
             message=f'{user_name} liked your thread "{thread.title}"'
         )
@@ -45,10 +71,11 @@ def create_follow_notification(follower, following):
     '''
     
     follower_name = f"{follower.profile.firstname} {follower.profile.lastname}" if hasattr(follower, 'profile') else follower.username
-    Notification.objects.create(
+    upsert_notification(
         recipient=following,
         sender=follower,
         notification_type='follow',
+        target_id=following.id,
         message=f'{follower_name} started following you'
     )
 
@@ -89,10 +116,11 @@ def create_comment_like_notification(comment, user):
     
     if comment.author != user:
         user_name = f"{user.profile.firstname} {user.profile.lastname}" if hasattr(user, 'profile') else user.username
-        Notification.objects.create(
+        upsert_notification(
             recipient=comment.author,
             sender=user,
             notification_type='like_comment',
+            target_id=comment.id,
             thread=comment.thread,
             comment=comment,
             message=f'{user_name} liked your comment'
@@ -108,10 +136,11 @@ def create_reply_like_notification(reply, user):
     
     if reply.author != user:
         user_name = f"{user.profile.firstname} {user.profile.lastname}" if hasattr(user, 'profile') else user.username
-        Notification.objects.create(
+        upsert_notification(
             recipient=reply.author,
             sender=user,
             notification_type='like_reply',
+            target_id=reply.id,
             thread=reply.comment.thread,
             comment=reply.comment,
             reply=reply,
@@ -167,3 +196,39 @@ def create_announcement_notification(thread, author):
     
     if notifications:
         Notification.objects.bulk_create(notifications)
+
+
+def get_read_until(user):
+    
+    '''
+    Return the user's read watermark (or None)
+    Notifications created at or before it count as read
+    '''
+    
+    return NotificationReadMarker.objects.filter(user=user).values_list('read_until', flat=True).first()
+
+
+def unread_filter(read_until):
+    
+    '''Filter for unread notifications, taking the read watermark into account'''
+    
+    unread = Q(is_read=False)
+    if read_until:
+        unread &= Q(created_at__gt=read_until)
+    return unread
+
+
+def advance_read_marker(user, read_until):
+    
+    '''
+    Move the user's read watermark forward to read_until
+    The watermark never moves backwards
+    '''
+    
+    updated = NotificationReadMarker.objects.filter(
+        user=user,
+        read_until__lt=read_until
+    ).update(read_until=read_until, updated_at=timezone.now())
+    
+    if not updated:
+        NotificationReadMarker.objects.get_or_create(user=user, defaults={'read_until': read_until})
@@ -2,25 +2,46 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.utils import timezone
+
+from stream.pagination import KeysetPagination
 
 from .models import Notification
 from .serializers import NotificationSerializer
+from .utils import get_read_until, unread_filter, advance_read_marker
 
 class NotificationListView(APIView):
     
-    '''API endpoint to list all notifications for authenticated user'''
+    '''
+    API endpoint to list notifications for authenticated user, newest first
+    Cursor paginated on (created_at, id); pass ?unread=1 for unread only
+    '''
     
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         notifications = Notification.objects.filter(recipient=request.user)
-        serializer = NotificationSerializer(notifications, many=True, context={'request': request})
+        read_until = get_read_until(request.user)
+        unread_notifications = notifications.filter(unread_filter(read_until))
+        
+        if request.query_params.get('unread') in ('1', 'true'):
+            notifications = unread_notifications
         
-        unread_count = notifications.filter(is_read=False).count()
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(
+            notifications.select_related('sender__profile', 'thread'),
+            request
+        )
+        serializer = NotificationSerializer(
+            page,
+            many=True,
+            context={'request': request, 'read_until': read_until}
+        )
         
         return Response({
             'notifications': serializer.data,
-            'unread_count': unread_count
+            'unread_count': unread_notifications.count(),
+            'next': paginator.get_next_link()
         }, status=status.HTTP_200_OK)
         
 class NotificationMarkAsReadView(APIView):
@@ -45,17 +66,81 @@ class NotificationMarkAsReadView(APIView):
             
 class NotificationMarkAllAsReadView(APIView):
     
-    '''API endpoint to mark all as read notification'''
+    '''
+    API endpoint to mark all as read notification
+    Moves the user's read watermark to now instead of updating every row
+    '''
     
     permission_classes = [IsAuthenticated]
     
     def patch(self, request):
-        notifications = Notification.objects.filter(recipient=request.user, is_read=False)
-        notifications.update(is_read=True)
+        read_until = timezone.now()
+        advance_read_marker(request.user, read_until)
         
         return Response({
             'message': 'All notifications marked as read',
-            'updated_count': notifications.count()
+            'read_until': read_until
+        }, status=status.HTTP_200_OK)
+        
+class NotificationBulkMarkAsReadView(APIView):
+    
+    '''
+    API endpoint to mark several notifications as read in one call
+    Accepts either {"ids": [...]} or {"up_to": <id>}; up_to moves the read
+    watermark so that notification and everything older is read
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    max_ids = 200
+    
+    def patch(self, request):
+        ids = request.data.get('ids')
+        up_to = request.data.get('up_to')
+        
+        if up_to is not None:
+            try:
+                read_until = Notification.objects.values_list('created_at', flat=True).get(
+                    pk=up_to,
+                    recipient=request.user
+                )
+            except (Notification.DoesNotExist, TypeError, ValueError):
+                return Response({
+                    'error': 'Notification not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            advance_read_marker(request.user, read_until)
+            
+            return Response({
+                'message': 'Notifications marked as read',
+                'read_until': read_until
+            }, status=status.HTTP_200_OK)
+        
+        if not isinstance(ids, list) or not ids:
+            return Response({
+                'error': 'Provide a non-empty list of ids or up_to'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(ids) > self.max_ids:
+            return Response({
+                'error': f'At most {self.max_ids} ids can be marked at once'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'ids must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        updated_count = Notification.objects.filter(
+            recipient=request.user,
+            id__in=ids,
+            is_read=False
+        ).update(is_read=True)
+        
+        return Response({
+            'message': 'Notifications marked as read',
+            'updated_count': updated_count
         }, status=status.HTTP_200_OK)
         
 class NotificationDeleteView(APIView):
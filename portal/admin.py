@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, UserFollow
+from .models import UserProfile, UserFollow, FollowSuggestion, EmailOutbox
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -38,4 +38,17 @@ class UserFollowAdmin(admin.ModelAdmin):
         ('User Follow Information', {
             'fields': ('follower__username', 'follower', 'following', 'created_at')
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'suggested_user', 'score', 'mutual_count', 'created_at']
+    search_fields = ['user__username', 'suggested_user__username']
+    readonly_fields = ['created_at']
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'expires_at', 'created_at', 'sent_at']
+    search_fields = ['to_email', 'subject']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
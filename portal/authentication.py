@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from stream.caching import bump_cache_versions, get_cache_version, is_shared_cache
+
+
+def _version_key(user_id):
+    return f'auth:user-version:{user_id}'
+
+
+def _user_key(user_id, version):
+    return f'auth:user:{user_id}:v{version}'
+
+
+def invalidate_cached_user(user_id):
+
+    '''
+    Drop the cached user/profile for user_id by bumping its version
+    A request that loaded stale data before the bump writes it under the
+    old version, which is never read again
+    '''
+
+    bump_cache_versions([_version_key(user_id)])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    '''
+    JWTAuthentication that resolves the user, with the profile preloaded,
+    from a short-TTL versioned cache keyed by the token's user id, so hot
+    read paths make no identity queries. See portal/signals.py for invalidation.
+    The cache is skipped unless it is shared between workers: invalidation
+    only reaches the cache it runs against, and a per-process cache would
+    keep deactivated users and old tokens working on the other workers
+    '''
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        shared = is_shared_cache()
+        key = _user_key(user_id, get_cache_version(_version_key(user_id))) if shared else None
+        user = cache.get(key) if shared else None
+
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('profile').get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+
+            if shared:
+                cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,104 @@
+from django.db.models import Q
+
+from .models import UserProfile, UserFollow
+from .utils import get_following_ids, get_follower_ids
+
+# upper bound on rows pulled from each prefix probe before ranking
+CANDIDATE_LIMIT = 50
+
+# follow-graph proximity weights
+FOLLOWING_WEIGHT = 2
+FOLLOWER_WEIGHT = 1
+
+MAX_TERMS = 3
+MAX_TERM_LENGTH = 30
+
+
+def get_terms(query):
+    return [term[:MAX_TERM_LENGTH] for term in query.split()[:MAX_TERMS]]
+
+
+def _matches(term, *values):
+    term = term.lower()
+    return any((value or '').lower().startswith(term) for value in values)
+
+
+def autocomplete_users(viewer, query, limit):
+
+    '''
+    Type-ahead over username, firstname and lastname
+    Every probe is a case-insensitive prefix match served by the indexes
+    from migration 0011 and capped at CANDIDATE_LIMIT rows. The viewer's
+    own connections are probed separately so they are never crowded out
+    by a popular prefix. Remaining terms are checked in Python.
+    Returns (profiles, following_ids) with the best matches first
+    '''
+
+    terms = get_terms(query)
+    if not terms:
+        return [], set()
+
+    head = terms[0]
+
+    candidate_ids = set(
+        UserFollow.objects.filter(follower=viewer).filter(
+            Q(following__username__istartswith=head) |
+            Q(following__profile__firstname__istartswith=head) |
+            Q(following__profile__lastname__istartswith=head)
+        ).values_list('following_id', flat=True)[:CANDIDATE_LIMIT]
+    )
+    candidate_ids.update(
+        UserProfile.objects.filter(
+            user__username__iexact=head
+        ).values_list('user_id', flat=True)[:1]
+    )
+    candidate_ids.update(
+        UserProfile.objects.filter(
+            user__username__istartswith=head
+        ).values_list('user_id', flat=True)[:CANDIDATE_LIMIT]
+    )
+    for field in ('firstname', 'lastname'):
+        candidate_ids.update(
+            UserProfile.objects.filter(
+                **{f'{field}__istartswith': head}
+            ).values_list('user_id', flat=True)[:CANDIDATE_LIMIT]
+        )
+
+    candidate_ids.discard(viewer.id)
+    if not candidate_ids:
+        return [], set()
+
+    profiles = [
+        profile for profile in UserProfile.objects.filter(
+            user_id__in=candidate_ids,
+            user__is_active=True,
+            user__is_superuser=False
+        ).select_related('user')
+        if all(
+            _matches(term, profile.user.username, profile.firstname, profile.lastname)
+            for term in terms[1:]
+        )
+    ]
+
+    ids = [profile.user_id for profile in profiles]
+    following_ids = get_following_ids(viewer, ids)
+    follower_ids = get_follower_ids(viewer, ids)
+
+    def rank(profile):
+        username = profile.user.username.lower()
+        proximity = 0
+        if profile.user_id in following_ids:
+            proximity += FOLLOWING_WEIGHT
+        if profile.user_id in follower_ids:
+            proximity += FOLLOWER_WEIGHT
+        return (
+            username != head.lower(),
+            -proximity,
+            not _matches(head, username),
+            -profile.followers_count,
+            len(username),
+            username
+        )
+
+    profiles.sort(key=rank)
+    return profiles[:limit], following_ids
@@ -1,7 +1,42 @@
+import logging
+import threading
+from datetime import timedelta
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from stream.tasks import run_after_commit
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+
+    '''Shared requests.Session so deliveries reuse keep-alive connections to the mail API'''
+
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                pool_size = getattr(settings, 'EMAIL_API_POOL_SIZE', 4)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
 
-def send_email_via_api(to_email, subject, body):
+
+def send_email_via_api(to_email, subject, body, session=None):
     payload = {
         "to": to_email,
         "subject": subject,
@@ -9,7 +44,7 @@ def send_email_via_api(to_email, subject, body):
         "sender": "Stream App"
     }
 
-    response = requests.post(
+    response = (session or get_session()).post(
         settings.EMAIL_API_URL,
         json=payload,
         timeout=getattr(settings, "EMAIL_API_TIMEOUT", 10)
@@ -17,3 +52,110 @@ def send_email_via_api(to_email, subject, body):
 
     response.raise_for_status()
     return response.json()
+
+
+def queue_email(to_email, subject, body, expires_in=None):
+
+    '''
+    Record an email in the outbox as part of the current transaction
+    Delivery is attempted in the background once the transaction commits;
+    the send_outbox_emails worker retries anything left pending.
+    Pass expires_in (seconds) for messages that are useless once late,
+    e.g. one-time codes: they are dropped rather than retried after that
+    '''
+
+    expires_at = timezone.now() + timedelta(seconds=expires_in) if expires_in is not None else None
+    message = EmailOutbox.objects.create(to_email=to_email, subject=subject, body=body, expires_at=expires_at)
+    run_after_commit(deliver_outbox, ids=[message.id])
+    return message
+
+
+def queue_emails(messages, batch_size=500):
+
+    '''
+    Record many (to_email, subject, body) emails with one insert per batch
+    Nothing is sent inline; the send_outbox_emails worker delivers them
+    '''
+
+    return EmailOutbox.objects.bulk_create(
+        [EmailOutbox(to_email=to_email, subject=subject, body=body) for to_email, subject, body in messages],
+        batch_size=batch_size
+    )
+
+
+def get_retry_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def claim_due_messages(batch_size, ids=None):
+
+    '''
+    Lock and lease a batch of due messages so concurrent workers skip them
+    The lease expires on its own if a worker dies mid-batch.
+    Pending messages past their expiry are marked expired and never sent
+    '''
+
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_API_TIMEOUT', 10) * (batch_size + 1))
+
+    EmailOutbox.objects.filter(status='pending', expires_at__lte=now).update(status='expired', body='')
+
+    with transaction.atomic():
+        due = EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+            status='pending',
+            next_attempt_at__lte=now
+        )
+        if ids is not None:
+            due = due.filter(id__in=ids)
+
+        messages = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        EmailOutbox.objects.filter(id__in=[message.id for message in messages]).update(
+            next_attempt_at=now + lease
+        )
+
+    return messages
+
+
+def deliver_outbox(ids=None, batch_size=50, max_attempts=None):
+
+    '''
+    Send one batch of due outbox messages over the pooled session
+    Failures are retried with exponential backoff until max_attempts; the
+    body is cleared once a message is sent or gives up
+    Returns (sent, failed) counts
+    '''
+
+    max_attempts = max_attempts or getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    session = get_session()
+    sent = failed = 0
+
+    for message in claim_due_messages(batch_size, ids=ids):
+        attempts = message.attempts + 1
+        try:
+            send_email_via_api(message.to_email, message.subject, message.body, session=session)
+        except Exception as exc:
+            logger.warning('Email %s to %s failed (attempt %s): %s', message.id, message.to_email, attempts, exc)
+            update = {'status': 'pending'}
+            if attempts >= max_attempts:
+                update = {'status': 'failed', 'body': ''}
+            EmailOutbox.objects.filter(id=message.id).update(
+                attempts=attempts,
+                last_error=str(exc)[:1000],
+                next_attempt_at=timezone.now() + get_retry_delay(attempts),
+                **update
+            )
+            failed += 1
+            continue
+
+        EmailOutbox.objects.filter(id=message.id).update(
+            attempts=attempts,
+            last_error='',
+            status='sent',
+            sent_at=timezone.now(),
+            body=''
+        )
+        sent += 1
+
+    return sent, failed
@@ -0,0 +1,58 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.suggestions import refresh_follow_suggestions
+
+
+class Command(BaseCommand):
+
+    '''
+    Periodic batch job that rebuilds the stored "people you may know"
+    suggestions; follow/unfollow refreshes the follower incrementally in between
+    '''
+
+    help = 'Recompute follow suggestions for every active user (or one user)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only recompute suggestions for this username')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users loaded per batch')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+            stored = refresh_follow_suggestions(user)
+            self.stdout.write(self.style.SUCCESS(f'Stored {stored} suggestions for {user.username}'))
+            return
+
+        users = User.objects.filter(
+            is_active=True,
+            is_superuser=False,
+            profile__isnull=False
+        ).only('id').order_by('id')
+
+        processed = 0
+        stored = 0
+        last_id = 0
+
+        while True:
+            batch = list(users.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+
+            for user in batch:
+                stored += refresh_follow_suggestions(user)
+
+            processed += len(batch)
+            last_id = batch[-1].id
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {stored} suggestions for {processed} users, took {elapsed:.2f}s'
+        ))
@@ -0,0 +1,262 @@
+import csv
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from community.enrollment import enroll_users
+from portal.email_backend import queue_emails
+from portal.models import UserProfile
+
+REQUIRED_COLUMNS = ('username', 'email', 'firstname', 'lastname', 'birth_date', 'gender', 'role', 'department', 'course')
+EMAIL_DOMAIN = '@ssct.edu.ph'
+
+CHOICES = {
+    'gender': {value for value, _label in UserProfile.GENDER_CHOICES},
+    'role': {value for value, _label in UserProfile.ROLE_CHOICES},
+    'department': {value for value, _label in UserProfile.DEPARTMENT_CHOICES},
+    'course': {value for value, _label in UserProfile.COURSE_CHOICES},
+}
+
+
+def _init_worker():
+    # spawned workers start without configured settings
+    django.setup()
+
+
+def hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def parse_row(row):
+
+    '''Clean one CSV row into (user fields, profile fields) or raise ValueError'''
+
+    values = {column: (row.get(column) or '').strip() for column in REQUIRED_COLUMNS}
+
+    missing = [column for column, value in values.items() if not value]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    values['email'] = values['email'].lower()
+    if not values['email'].endswith(EMAIL_DOMAIN):
+        raise ValueError(f'email must be from {EMAIL_DOMAIN[1:]} domain')
+
+    for field, allowed in CHOICES.items():
+        values[field] = values[field].lower()
+        if values[field] not in allowed:
+            raise ValueError(f'invalid {field} {values[field]!r}')
+
+    try:
+        values['birth_date'] = date.fromisoformat(values['birth_date'])
+    except ValueError:
+        raise ValueError('birth_date must be YYYY-MM-DD')
+
+    password = (row.get('password') or '').strip()
+    if password and len(password) < 8:
+        raise ValueError('password must be at least 8 characters')
+
+    user = {
+        'username': values.pop('username'),
+        'email': values.pop('email'),
+        'password': password,
+    }
+    return user, values
+
+
+def invitation_email(user, profile, temporary_password):
+    subject = 'Stream - Your account is ready'
+    lines = [
+        f"Hello {profile['firstname']},",
+        '',
+        f"A Stream account has been created for you with the username {user['username']}.",
+    ]
+    if temporary_password:
+        lines.append(f'Your temporary password is: {temporary_password}')
+        lines.append('Please change it after your first sign in.')
+    lines += [
+        '',
+        'To activate your account, request a verification code from the app and enter it when prompted.',
+        '',
+        'Thank you,',
+        'Stream Team | Developer',
+    ]
+    return user['email'], subject, '\n'.join(lines)
+
+
+class Command(BaseCommand):
+
+    '''
+    Term-start onboarding: import users and profiles from a CSV
+    Columns: username, email, firstname, lastname, birth_date (YYYY-MM-DD),
+    gender, role, department, course and an optional password (a temporary
+    one is generated and emailed when blank). Rows whose username or email
+    already exists are skipped, so re-running the same file is safe.
+    Accounts start inactive, as with SignUpView, until verified by OTP;
+    active accounts are enrolled into matching communities right away
+    '''
+
+    help = 'Bulk create users and profiles from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows created per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (0 hashes inline)')
+        parser.add_argument('--active', action='store_true', help='Create accounts already activated')
+        parser.add_argument('--no-email', action='store_true', help='Do not queue invitation emails')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file and report what would be created')
+
+    def read_rows(self, path):
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as handle:
+                reader = csv.DictReader(handle)
+                missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or [])
+                if missing:
+                    raise CommandError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+                yield from enumerate(reader, start=2)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['workers'] is not None and options['workers'] < 0:
+            raise CommandError('--workers must be 0 or more')
+
+        started = time.monotonic()
+        self.stats = {'created': 0, 'skipped': 0, 'invalid': 0, 'enrolled': 0, 'hash_seconds': 0.0}
+        self.seen = set()
+
+        executor = None
+        self.workers = options['workers'] if options['workers'] is not None else os.cpu_count() or 1
+        if self.workers and not options['dry_run']:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+        try:
+            batch = []
+            for line, row in self.read_rows(options['csv_file']):
+                try:
+                    batch.append(parse_row(row))
+                except ValueError as exc:
+                    self.stats['invalid'] += 1
+                    self.stderr.write(f'Line {line}: {exc}')
+                    continue
+
+                if len(batch) >= batch_size:
+                    self.process_batch(batch, executor, options)
+                    batch = []
+
+            if batch:
+                self.process_batch(batch, executor, options)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        stats = self.stats
+        action = 'Would create' if options['dry_run'] else 'Created'
+        rate = stats['created'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {stats['created']} users ({stats['skipped']} already existed, {stats['invalid']} invalid rows), "
+            f"took {elapsed:.2f}s ({rate:.0f} users/s, {stats['hash_seconds']:.2f}s hashing)"
+        ))
+        if stats['enrolled']:
+            self.stdout.write(f"Added {stats['enrolled']} community memberships")
+
+    def filter_new(self, batch):
+
+        '''Drop rows that already exist, in the database or earlier in the file'''
+
+        usernames = [user['username'] for user, _profile in batch]
+        emails = [user['email'] for user, _profile in batch]
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        # incoming emails are lowercased, existing ones may not be (SignUpView keeps the case)
+        taken_emails = set(
+            User.objects.annotate(email_lower=Lower('email')).filter(
+                email_lower__in=emails
+            ).values_list('email_lower', flat=True)
+        )
+
+        fresh = []
+        for user, profile in batch:
+            keys = (('username', user['username']), ('email', user['email']))
+            if user['username'] in taken_usernames or user['email'] in taken_emails or any(key in self.seen for key in keys):
+                self.stats['skipped'] += 1
+                continue
+            self.seen.update(keys)
+            fresh.append((user, profile))
+        return fresh
+
+    def hash_batch(self, passwords, executor):
+        started = time.monotonic()
+        if executor is None:
+            hashed = hash_passwords(passwords)
+        else:
+            size = max(1, -(-len(passwords) // self.workers))
+            chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+            hashed = [password for chunk in executor.map(hash_passwords, chunks) for password in chunk]
+        self.stats['hash_seconds'] += time.monotonic() - started
+        return hashed
+
+    def process_batch(self, batch, executor, options):
+        batch = self.filter_new(batch)
+        if not batch:
+            return
+
+        if options['dry_run']:
+            self.stats['created'] += len(batch)
+            return
+
+        temporary = {}
+        passwords = []
+        for user, _profile in batch:
+            if not user['password']:
+                temporary[user['username']] = user['password'] = secrets.token_urlsafe(9)
+            passwords.append(user['password'])
+        hashed = self.hash_batch(passwords, executor)
+
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(
+                    username=user['username'],
+                    email=user['email'],
+                    password=password,
+                    is_active=options['active']
+                )
+                for (user, _profile), password in zip(batch, hashed)
+            ])
+
+            # re-read the ids: not every backend returns them from bulk_create
+            user_ids = dict(
+                User.objects.filter(
+                    username__in=[user['username'] for user, _profile in batch]
+                ).values_list('username', 'id')
+            )
+
+            UserProfile.objects.bulk_create([
+                UserProfile(user_id=user_ids[user['username']], **profile)
+                for user, profile in batch
+            ])
+
+            if not options['no_email']:
+                queue_emails([
+                    invitation_email(user, profile, temporary.get(user['username']))
+                    for user, profile in batch
+                ])
+
+        # bulk_create sends no signals, so run the enrollment rules here
+        if options['active']:
+            self.stats['enrolled'] += enroll_users(user_ids.values())
+
+        self.stats['created'] += len(batch)
+        if options['verbosity'] > 1:
+            self.stdout.write(f"Batch: {len(batch)} users, {self.stats['created']} so far")
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from portal.models import UserProfile, UserFollow
+
+
+class Command(BaseCommand):
+
+    '''
+    Recompute UserProfile.followers_count/following_count from UserFollow
+    Only profiles whose stored counts drifted are written back
+    '''
+
+    help = 'Repair drift in the denormalized follower/following counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Profiles checked per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted profiles')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+        followers = UserFollow.objects.filter(
+            following=OuterRef('user_id')
+        ).values('following').annotate(total=Count('id')).values('total')
+        following = UserFollow.objects.filter(
+            follower=OuterRef('user_id')
+        ).values('follower').annotate(total=Count('id')).values('total')
+
+        profiles = UserProfile.objects.annotate(
+            actual_followers=Coalesce(Subquery(followers), 0),
+            actual_following=Coalesce(Subquery(following), 0)
+        ).only('id', 'followers_count', 'following_count').order_by('id')
+
+        checked = 0
+        repaired = 0
+        last_id = 0
+
+        while True:
+            batch = list(profiles.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            drifted = []
+            for profile in batch:
+                if (profile.followers_count, profile.following_count) != (profile.actual_followers, profile.actual_following):
+                    profile.followers_count = profile.actual_followers
+                    profile.following_count = profile.actual_following
+                    drifted.append(profile)
+
+            if drifted and not options['dry_run']:
+                UserProfile.objects.bulk_update(drifted, ['followers_count', 'following_count'])
+
+            checked += len(batch)
+            repaired += len(drifted)
+            last_id = batch[-1].id
+
+        elapsed = time.monotonic() - started
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {repaired} of {checked} profiles with drifted follow counts, took {elapsed:.2f}s'
+        ))
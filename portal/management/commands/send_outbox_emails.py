@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from portal.email_backend import deliver_outbox
+from portal.models import EmailOutbox
+
+
+class Command(BaseCommand):
+
+    '''
+    Delivery worker for the email outbox
+    Sends due messages in batches over a pooled keep-alive session, retrying
+    failures with exponential backoff; run with --loop to keep polling
+    '''
+
+    help = 'Deliver pending emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages sent per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new messages')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls when idle')
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=getattr(settings, 'EMAIL_OUTBOX_RETENTION_DAYS', 7),
+            help='Delete sent and expired messages older than this many days (0 disables)'
+        )
+
+    def purge_sent(self, days):
+        if days <= 0:
+            return 0
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = EmailOutbox.objects.filter(
+            Q(status='sent', sent_at__lt=cutoff) | Q(status='expired', created_at__lt=cutoff)
+        ).delete()
+        return deleted
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        purged = self.purge_sent(options['purge_days'])
+        if purged:
+            self.stdout.write(f'Purged {purged} sent and expired messages')
+
+        started = time.monotonic()
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = deliver_outbox(batch_size=batch_size)
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                self.stdout.write(f'Batch: {sent} sent, {failed} failed')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {total_sent} emails, {total_failed} failed attempts, took {elapsed:.2f}s'
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    UserProfile = apps.get_model('portal', 'UserProfile')
+    UserFollow = apps.get_model('portal', 'UserFollow')
+
+    followers = UserFollow.objects.filter(
+        following=OuterRef('user_id')
+    ).values('following').annotate(total=Count('id')).values('total')
+    following = UserFollow.objects.filter(
+        follower=OuterRef('user_id')
+    ).values('follower').annotate(total=Count('id')).values('total')
+
+    UserProfile.objects.update(
+        followers_count=Coalesce(Subquery(followers), 0),
+        following_count=Coalesce(Subquery(following), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0007_alter_userprofile_profile_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
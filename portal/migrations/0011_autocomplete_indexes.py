@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+from django.db import migrations
+
+
+# Case-insensitive prefix indexes for user autocomplete. istartswith compiles
+# to UPPER(col::text) LIKE UPPER(%s) on PostgreSQL and to LIKE on SQLite,
+# neither of which can use a plain btree index, so the indexes are vendor specific.
+INDEXES = [
+    ('portal_user_username_prefix_idx', 'auth_user', 'username'),
+    ('portal_profile_firstname_prefix_idx', 'portal_userprofile', 'firstname'),
+    ('portal_profile_lastname_prefix_idx', 'portal_userprofile', 'lastname'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+
+    for name, table, column in INDEXES:
+        if vendor == 'postgresql':
+            expression = f'UPPER({quote(column)}::text) text_pattern_ops'
+        elif vendor == 'sqlite':
+            expression = f'{quote(column)} COLLATE NOCASE'
+        elif vendor == 'mysql' and table == 'auth_user':
+            # the unique index on username already serves prefix lookups
+            continue
+        else:
+            expression = quote(column)
+
+        schema_editor.execute(
+            f'CREATE INDEX {quote(name)} ON {quote(table)} ({expression})'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+
+    for name, table, column in INDEXES:
+        if vendor == 'mysql':
+            if table == 'auth_user':
+                continue
+            schema_editor.execute(f'DROP INDEX {quote(name)} ON {quote(table)}')
+        else:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {quote(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('portal', '0010_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -85,6 +85,10 @@ class UserProfile(models.Model):
     last_profile_details_update = models.DateTimeField(null=True, blank=True)
     # track last time password was changed separately
     last_password_change = models.DateTimeField(null=True, blank=True)
+    # denormalized UserFollow counts, kept in step by portal.utils.follow_user/unfollow_user
+    # and repaired with `python manage.py repair_follow_counts`
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
     
     def __str__(self):
         return f"{self.user.username} - {self.firstname} {self.lastname}"
@@ -172,3 +176,67 @@ class UserOTP(models.Model):
     
     def __str__(self):
         return f'OTP for {self.user.username} (verified={self.is_verified})'
+
+class FollowSuggestion(models.Model):
+    
+    '''
+    Precomputed "people you may know" entry, refreshed in batch by
+    `python manage.py compute_follow_suggestions` and updated incrementally
+    after follow changes (portal/suggestions.py)
+    '''
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    mutual_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('user', 'suggested_user')
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['user', '-score'], name='follow_suggestion_score_idx'),
+        ]
+        verbose_name = 'Follow Suggestion'
+        verbose_name_plural = 'Follow Suggestions'
+    
+    def __str__(self):
+        return f'{self.suggested_user.username} for {self.user.username} ({self.score:.1f})'
+
+class EmailOutbox(models.Model):
+    
+    '''
+    Outgoing email recorded in the caller's transaction and delivered by
+    `python manage.py send_outbox_emails` (and a post-commit background kick)
+    Messages past expires_at are dropped instead of sent, and the body is
+    cleared once a message is done with, so codes do not linger in the table
+    '''
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+    ]
+    
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+        verbose_name = 'Email Outbox'
+        verbose_name_plural = 'Email Outbox'
+    
+    def __str__(self):
+        return f'{self.subject} -> {self.to_email} ({self.status})'
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import UserProfile, UserFollow
+from .models import UserProfile, UserFollow, FollowSuggestion
 from .utils import create_send_otp_verification_code
 
 import json
@@ -92,20 +93,22 @@ class SignUpSerializer(serializers.ModelSerializer):
         validated_data.pop('confirm_password')
         profile_data = validated_data.pop('profile')
         
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            is_active=False
-        )
-        
-        UserProfile.objects.create(
-            user=user,
-            **profile_data
-        )
-        
-        request = self.context.get('request') if self.context else None
-        create_send_otp_verification_code(user, request=request)
+        # the OTP email is recorded in the outbox in the same transaction
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=validated_data['username'],
+                email=validated_data['email'],
+                password=validated_data['password'],
+                is_active=False
+            )
+            
+            UserProfile.objects.create(
+                user=user,
+                **profile_data
+            )
+            
+            request = self.context.get('request') if self.context else None
+            create_send_otp_verification_code(user, request=request)
         
         return user
         
@@ -129,8 +132,8 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
     can_change_password = serializers.SerializerMethodField()
     days_until_password_change = serializers.SerializerMethodField()
     
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
     is_following = serializers.SerializerMethodField()
     
     class Meta:
@@ -183,17 +186,14 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
         
         return obj.days_until_next_update()
     
-    def get_followers_count(self, obj):
-        return obj.user.followers.count()
-    
-    def get_following_count(self, obj):
-        return obj.user.following.count()
-    
     def get_is_following(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            if request.user == obj.user:
+            if request.user.id == obj.user_id:
                 return None  # Can't follow yourself
+            following_ids = self.context.get('following_ids')
+            if following_ids is not None:
+                return obj.user_id in following_ids
             return UserFollow.objects.filter(
                 follower=request.user,
                 following=obj.user
@@ -206,6 +206,62 @@ class UserProfileDetailSerializer(serializers.ModelSerializer):
     def get_days_until_password_change(self, obj):
         return obj.days_until_password_change()
     
+class UserCardSerializer(serializers.ModelSerializer):
+    
+    '''
+    compact user card for lists
+    is_following is read from context['following_ids'] (a set of user ids the
+    viewer follows, loaded once per page) and falls back to a query without it
+    '''
+    
+    username = serializers.CharField(source='user.username', read_only=True)
+    profile_image_url = serializers.SerializerMethodField()
+    is_following = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UserProfile
+        fields = [
+            'username',
+            'firstname',
+            'lastname',
+            'profile_image_url',
+            'role',
+            'department',
+            'course',
+            'is_following'
+        ]
+    
+    def get_profile_image_url(self, obj):
+        if obj.profile_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.profile_image.url)
+        return None
+    
+    def get_is_following(self, obj):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            if request.user.id == obj.user_id:
+                return None
+            following_ids = self.context.get('following_ids')
+            if following_ids is not None:
+                return obj.user_id in following_ids
+            return UserFollow.objects.filter(
+                follower=request.user,
+                following_id=obj.user_id
+            ).exists()
+        return False
+    
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    
+    '''suggested account with the number of mutual connections'''
+    
+    user = UserCardSerializer(source='suggested_user.profile', read_only=True)
+    
+    class Meta:
+        model = FollowSuggestion
+        fields = ['user', 'mutual_count', 'score']
+    
 class UserFollowSerializer(serializers.ModelSerializer):
     follower_username = serializers.CharField(source='follower.username', read_only=True)
     following_username = serializers.CharField(source='following.username', read_only=True)
@@ -257,13 +313,13 @@ class UpdateProfileDetailsSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         
-        '''Update profile and username'''
+        '''Update profile and username; the caller saves the profile's edited fields'''
         
         username = validated_data.pop('username', None)
         
         if username:
             instance.user.username = username
-            instance.user.save()
+            instance.user.save(update_fields=['username'])
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
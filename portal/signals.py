@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .models import UserProfile
+
+
+def invalidate_after_commit(user_id):
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    
+    '''password, is_active or any other change to the user drops the cached identity'''
+    
+    invalidate_after_commit(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    invalidate_after_commit(instance.user_id)
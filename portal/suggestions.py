@@ -0,0 +1,163 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from community.models import CommunityMembership
+from .models import UserProfile, UserFollow, FollowSuggestion
+
+# score weights per signal
+MUTUAL_WEIGHT = 3.0
+COMMUNITY_WEIGHT = 1.5
+COURSE_WEIGHT = 2.0
+DEPARTMENT_WEIGHT = 1.0
+
+# upper bound on candidates pulled from each signal before scoring
+CANDIDATE_LIMIT = 500
+
+
+def compute_follow_suggestions(user, limit=None, candidate_ids=None):
+
+    '''
+    Score accounts the user might want to follow:
+    - friends of friends (people followed by people the user follows)
+    - co-members of the user's communities
+    - shared department/course with the user's profile
+    Pass candidate_ids to only score those accounts (incremental updates).
+    Returns [(user_id, score, mutual_count)] best first
+    '''
+
+    def restrict(queryset, field):
+        return queryset if candidate_ids is None else queryset.filter(**{f'{field}__in': candidate_ids})
+
+    limit = limit or getattr(settings, 'FOLLOW_SUGGESTIONS_LIMIT', 20)
+    profile = UserProfile.objects.filter(user=user).first()
+    if not profile:
+        return []
+
+    following = UserFollow.objects.filter(follower=user).values('following_id')
+    scores = defaultdict(float)
+    mutuals = {}
+
+    friends_of_friends = restrict(UserFollow.objects.filter(
+        follower_id__in=following
+    ), 'following_id').exclude(
+        following_id__in=following
+    ).exclude(
+        following_id=user.id
+    ).values('following_id').annotate(
+        total=Count('id')
+    ).order_by('-total').values_list('following_id', 'total')[:CANDIDATE_LIMIT]
+
+    for user_id, total in friends_of_friends:
+        mutuals[user_id] = total
+        scores[user_id] += MUTUAL_WEIGHT * total
+
+    co_members = restrict(CommunityMembership.objects.filter(
+        community_id__in=CommunityMembership.objects.filter(user=user).values('community_id')
+    ), 'user_id').exclude(
+        user_id__in=following
+    ).exclude(
+        user_id=user.id
+    ).values('user_id').annotate(
+        total=Count('id')
+    ).order_by('-total').values_list('user_id', 'total')[:CANDIDATE_LIMIT]
+
+    for user_id, total in co_members:
+        scores[user_id] += COMMUNITY_WEIGHT * total
+
+    # cold start: classmates, newest accounts first
+    classmates = restrict(UserProfile.objects.filter(
+        course=profile.course
+    ), 'user_id').exclude(
+        user_id__in=following
+    ).exclude(
+        user_id=user.id
+    ).order_by('-id').values_list('user_id', flat=True)[:limit]
+
+    for user_id in classmates:
+        scores.setdefault(user_id, 0.0)
+
+    candidates = UserProfile.objects.filter(
+        user_id__in=list(scores),
+        user__is_active=True,
+        user__is_superuser=False
+    ).values_list('user_id', 'department', 'course')
+
+    ranked = []
+    for user_id, department, course in candidates:
+        score = scores[user_id]
+        if course == profile.course:
+            score += COURSE_WEIGHT
+        if department == profile.department:
+            score += DEPARTMENT_WEIGHT
+        ranked.append((user_id, score, mutuals.get(user_id, 0)))
+
+    ranked.sort(key=lambda item: (-item[1], -item[2], item[0]))
+    return ranked[:limit]
+
+
+def lock_suggestions(user):
+    # refreshes and updates of one user's suggestions take turns, each
+    # scoring from what the previous one committed
+    UserProfile.objects.select_for_update().only('id').filter(user=user).first()
+
+
+def store_suggestions(user, ranked):
+    FollowSuggestion.objects.bulk_create([
+        FollowSuggestion(
+            user=user,
+            suggested_user_id=user_id,
+            score=score,
+            mutual_count=mutual_count
+        )
+        for user_id, score, mutual_count in ranked
+    ])
+
+
+def refresh_follow_suggestions(user):
+
+    '''Recompute and replace the stored suggestions for one user'''
+
+    with transaction.atomic():
+        lock_suggestions(user)
+        ranked = compute_follow_suggestions(user)
+        FollowSuggestion.objects.filter(user=user).delete()
+        store_suggestions(user, ranked)
+
+    return len(ranked)
+
+
+def update_follow_suggestions(user, changed_user_id):
+
+    '''
+    Incremental update after user follows or unfollows changed_user_id:
+    only that account and the accounts it follows (whose mutual counts just
+    changed) are re-scored, then the stored list is trimmed back to the limit.
+    With nothing stored (never computed, or all followed) it recomputes fully
+    Returns the number of suggestions scored
+    '''
+
+    limit = getattr(settings, 'FOLLOW_SUGGESTIONS_LIMIT', 20)
+    candidate_ids = [
+        changed_user_id,
+        *UserFollow.objects.filter(follower_id=changed_user_id).values_list('following_id', flat=True)[:CANDIDATE_LIMIT]
+    ]
+
+    with transaction.atomic():
+        lock_suggestions(user)
+        stored = FollowSuggestion.objects.filter(user=user)
+        if not stored.exists():
+            ranked = compute_follow_suggestions(user)
+            store_suggestions(user, ranked)
+            return len(ranked)
+
+        ranked = compute_follow_suggestions(user, candidate_ids=candidate_ids)
+        stored.filter(suggested_user_id__in=candidate_ids).delete()
+        store_suggestions(user, ranked)
+
+        keep = list(stored.order_by('-score', '-mutual_count', 'suggested_user_id').values_list('id', flat=True)[:limit])
+        stored.exclude(id__in=keep).delete()
+
+    return len(ranked)
@@ -1,3 +1,339 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import pyotp
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import email_backend
+from .email_backend import claim_due_messages, deliver_outbox, queue_email
+from .models import EmailOutbox, FollowSuggestion, UserFollow, UserOTP, UserProfile
+from .suggestions import compute_follow_suggestions, refresh_follow_suggestions
+from .utils import create_send_otp_verification_code, follow_user, get_follow_counts, unfollow_user
+
+
+def make_user(username, **profile):
+    user = User.objects.create_user(username, email=f'{username}@example.com', password='pw')
+    UserProfile.objects.create(user=user, **{
+        'firstname': username,
+        'lastname': 'test',
+        'birth_date': date(2000, 1, 1),
+        'gender': 'male',
+        'role': 'student',
+        'department': 'ccis',
+        'course': 'bscs',
+        **profile
+    })
+    return user
+
+
+class StandInMailAPI(BaseHTTPRequestHandler):
+
+    '''Mail API stand-in: answers with the queued status codes, then 200'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.received.append((self.client_address, payload))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class EmailOutboxTests(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInMailAPI)
+        self.server.received = []
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        # a fresh pooled session per test, pointed at the stand-in
+        email_backend._session = None
+        self.addCleanup(setattr, email_backend, '_session', None)
+        settings_override = override_settings(
+            EMAIL_API_URL=f'http://127.0.0.1:{self.server.server_port}/send',
+            EMAIL_OUTBOX_RETRY_BASE_SECONDS=30,
+            EMAIL_OUTBOX_MAX_ATTEMPTS=3
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_due(self):
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+
+    def test_failed_delivery_backs_off_then_sends(self):
+        message = EmailOutbox.objects.create(to_email='a@example.com', subject='s', body='hello')
+        self.server.statuses = [500]
+
+        self.assertEqual(deliver_outbox(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.body), ('pending', 1, 'hello'))
+        delay = message.next_attempt_at - timezone.now()
+        self.assertTrue(timedelta(seconds=25) < delay <= timedelta(seconds=30))
+
+        # not due again until the backoff has passed
+        self.assertEqual(deliver_outbox(), (0, 0))
+        self.assertEqual(len(self.server.received), 1)
+
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.body), ('sent', 2, ''))
+        self.assertEqual(self.server.received[-1][1]['body'], 'hello')
+
+    def test_backoff_doubles_until_the_message_gives_up(self):
+        message = EmailOutbox.objects.create(to_email='a@example.com', subject='s', body='hello')
+        self.server.statuses = [500, 500, 500]
+        delays = []
+
+        for _ in range(3):
+            self.make_due()
+            deliver_outbox()
+            message.refresh_from_db()
+            delays.append(round((message.next_attempt_at - timezone.now()).total_seconds(), -1))
+
+        self.assertEqual(delays[:2], [30, 60])
+        self.assertEqual((message.status, message.attempts, message.body), ('failed', 3, ''))
+
+    def test_batch_reuses_one_pooled_connection(self):
+        EmailOutbox.objects.bulk_create([
+            EmailOutbox(to_email=f'user{i}@example.com', subject='s', body='b')
+            for i in range(3)
+        ])
+        self.server.statuses = [500]
+
+        self.assertEqual(deliver_outbox(), (2, 1))
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (1, 0))
+
+        # every request, failed or not, went over the same keep-alive connection
+        clients = {client for client, _payload in self.server.received}
+        self.assertEqual(len(self.server.received), 4)
+        self.assertEqual(len(clients), 1)
+
+    def test_claimed_messages_are_leased_from_other_workers(self):
+        EmailOutbox.objects.bulk_create([
+            EmailOutbox(to_email=f'user{i}@example.com', subject='s', body='b')
+            for i in range(3)
+        ])
+
+        first = claim_due_messages(batch_size=2)
+        second = claim_due_messages(batch_size=2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({message.id for message in first} & {message.id for message in second})
+        self.assertEqual(claim_due_messages(batch_size=2), [])
+
+    def test_expired_message_is_dropped_unsent(self):
+        message = queue_email('a@example.com', 's', 'code 123456', expires_in=0)
+
+        self.assertEqual(deliver_outbox(), (0, 0))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.body), ('expired', ''))
+        self.assertEqual(self.server.received, [])
+
+    def test_otp_code_is_not_logged(self):
+        user = User.objects.create_user('otp', email='otp@example.com', password='pw')
+
+        with self.assertLogs('portal.utils', 'INFO') as logs:
+            otp = create_send_otp_verification_code(user)
+
+        code = pyotp.TOTP(UserOTP.objects.get(pk=otp.pk).secret, interval=60).now()
+        self.assertNotIn(code, '\n'.join(logs.output))
+        self.assertIn(code, EmailOutbox.objects.get(to_email='otp@example.com').body)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'NUM_PROXIES': 1,
+    'DEFAULT_THROTTLE_RATES': {'signin': '3/min', 'otp_verify': '1/min'},
+})
+class AuthThrottleTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rotated_forwarded_for_is_still_throttled(self):
+        url = reverse('token_obtain_pair')
+        codes = [
+            # the client controls everything before the address the proxy appends
+            self.client.post(url, {}, HTTP_X_FORWARDED_FOR=f'198.51.100.{i}, 203.0.113.7').status_code
+            for i in range(5)
+        ]
+        self.assertEqual(codes, [400, 400, 400, 429, 429])
+
+    def test_distinct_clients_get_their_own_bucket(self):
+        url = reverse('token_obtain_pair')
+        for _ in range(3):
+            self.client.post(url, {}, HTTP_X_FORWARDED_FOR='203.0.113.7')
+        response = self.client.post(url, {}, HTTP_X_FORWARDED_FOR='203.0.113.8')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejection_runs_no_query(self):
+        token = AccessToken.for_user(User.objects.create_user('throttled', password='pw'))
+        url = reverse('signup_verify')
+        self.client.post(url, {})
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {}, HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 429)
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class FollowSuggestionTests(TestCase):
+
+    def setUp(self):
+        # only the classmate shares the viewer's course and department
+        self.viewer = make_user('viewer')
+        self.classmate = make_user('classmate')
+        self.friend = make_user('friend', department='coe', course='bsce')
+        self.friend_of_friend = make_user('fof', department='cas', course='bsm')
+        self.stranger = make_user('stranger', department='cte', course='beed')
+        UserFollow.objects.create(follower=self.friend, following=self.friend_of_friend)
+        UserFollow.objects.create(follower=self.stranger, following=self.friend)
+        UserFollow.objects.create(follower=self.viewer, following=self.stranger)
+        refresh_follow_suggestions(self.viewer)
+
+    def suggestions(self):
+        return dict(FollowSuggestion.objects.filter(user=self.viewer).values_list('suggested_user_id', 'mutual_count'))
+
+    def follow(self, following, unfollow=False):
+        with mock.patch('portal.suggestions.compute_follow_suggestions', wraps=compute_follow_suggestions) as compute:
+            with self.captureOnCommitCallbacks(execute=True):
+                (unfollow_user if unfollow else follow_user)(self.viewer, following)
+        return compute
+
+    def test_follow_rescores_only_the_affected_accounts(self):
+        self.assertEqual(self.suggestions(), {self.friend.id: 1, self.classmate.id: 0})
+
+        compute = self.follow(self.friend)
+
+        self.assertEqual(self.suggestions(), {self.friend_of_friend.id: 1, self.classmate.id: 0})
+        self.assertEqual(
+            set(compute.call_args.kwargs['candidate_ids']),
+            {self.friend.id, self.friend_of_friend.id}
+        )
+
+    def test_unfollow_restores_the_previous_suggestions(self):
+        self.follow(self.friend)
+        self.follow(self.friend, unfollow=True)
+        self.assertEqual(self.suggestions(), {self.friend.id: 1, self.classmate.id: 0})
+
+    @override_settings(FOLLOW_SUGGESTIONS_LIMIT=2)
+    def test_stored_list_is_trimmed_to_the_limit(self):
+        extra = make_user('extra', department='cbt', course='bet')
+        UserFollow.objects.create(follower=self.friend, following=extra)
+        UserFollow.objects.create(follower=self.stranger, following=extra)
+
+        self.follow(self.friend)
+
+        # extra is followed by both accounts the viewer follows; the classmate
+        # ties with fof on score and loses on mutual count
+        self.assertEqual(self.suggestions(), {extra.id: 2, self.friend_of_friend.id: 1})
+
+    def test_nothing_stored_recomputes_fully(self):
+        FollowSuggestion.objects.filter(user=self.viewer).delete()
+        compute = self.follow(self.friend)
+        self.assertEqual(compute.call_args.kwargs, {})
+        self.assertEqual(self.suggestions(), {self.friend_of_friend.id: 1, self.classmate.id: 0})
+
+
+class FollowCountTests(TestCase):
+
+    def setUp(self):
+        self.follower = make_user('follower')
+        self.following = make_user('following')
+
+    def counts(self):
+        return get_follow_counts(self.follower), get_follow_counts(self.following)
+
+    def test_follow_and_unfollow_move_both_counts(self):
+        self.assertTrue(follow_user(self.follower, self.following))
+        self.assertEqual(self.counts(), ((0, 1), (1, 0)))
+
+        self.assertTrue(unfollow_user(self.follower, self.following))
+        self.assertEqual(self.counts(), ((0, 0), (0, 0)))
+
+    def test_repeated_follow_and_unfollow_count_once(self):
+        follow_user(self.follower, self.following)
+        self.assertFalse(follow_user(self.follower, self.following))
+        self.assertEqual(self.counts(), ((0, 1), (1, 0)))
+
+        unfollow_user(self.follower, self.following)
+        self.assertFalse(unfollow_user(self.follower, self.following))
+        self.assertEqual(self.counts(), ((0, 0), (0, 0)))
+
+    def test_counts_floor_at_zero(self):
+        follow_user(self.follower, self.following)
+        # drifted counts, e.g. rows removed behind the helpers' back
+        UserProfile.objects.update(followers_count=0, following_count=0)
+
+        self.assertTrue(unfollow_user(self.follower, self.following))
+        self.assertEqual(self.counts(), ((0, 0), (0, 0)))
+
+
+
+class UserDirectoryTests(APITestCase):
+
+    def setUp(self):
+        self.viewer = make_user('viewer', lastname='viewer')
+        self.client.force_authenticate(self.viewer)
+
+    def get_page(self, url=None, **params):
+        response = self.client.get(url or reverse('all_users'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def usernames(self, data):
+        return [user['username'] for user in data['users']]
+
+    def test_cursor_is_stable_across_inserts_and_name_ties(self):
+        # identical names, so pages split inside a tie broken by id
+        for name in ['ana', 'ben', 'cal', 'dee', 'eve']:
+            make_user(name, firstname='maria', lastname='santos')
+
+        first = self.get_page(page_size=2)
+        self.assertEqual(self.usernames(first), ['ana', 'ben'])
+
+        # sorts before the cursor: must not shift later pages
+        make_user('aaron', firstname='maria', lastname='abad')
+        second = self.get_page(first['next'])
+        third = self.get_page(second['next'])
+
+        self.assertEqual(self.usernames(second), ['cal', 'dee'])
+        self.assertEqual(self.usernames(third), ['eve'])
+        self.assertIsNone(third['next'])
+        self.assertEqual(third['page_count'], 1)
+
+    def test_page_is_one_query_with_follow_state(self):
+        followed = make_user('followed', lastname='a')
+        make_user('other', lastname='b')
+        follow_user(self.viewer, followed)
+
+        with self.assertNumQueries(1):
+            data = self.get_page()
+
+        self.assertEqual(
+            [(user['username'], user['is_following'], user['followers_count']) for user in data['users']],
+            [('followed', True, 1), ('other', False, 0)]
+        )
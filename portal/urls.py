@@ -1,7 +1,8 @@
 from django.urls import path 
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     SignUpView, 
+    SignInTokenView,
     UserProfileView, 
     UpdateProfileImageView,
     UpdateProfileDetailsView,
@@ -10,6 +11,9 @@ from .views import (
     UserFollowersListView,
     UserFollowingListView,
     AllUsersListView,
+    UserAutocompleteView,
+    FollowSuggestionsView,
+    UserRelationshipsView,
     OTPVerifyView,
     OTPResendView
 )
@@ -18,7 +22,7 @@ urlpatterns = [
     path('signup/', SignUpView.as_view(), name='signup'),
     path('signup/verify/', OTPVerifyView.as_view(), name='signup_verify'),  
     path('signup/resend/', OTPResendView.as_view(), name='signup_resend'), 
-    path('signin/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('signin/', SignInTokenView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('profile/', UserProfileView.as_view(), name='user_profile'),
     path('profile/details/', UpdateProfileDetailsView.as_view(), name='update_profile_details'),
@@ -28,4 +32,7 @@ urlpatterns = [
     path('followers/<str:username>/', UserFollowersListView.as_view(), name='user_followers'),
     path('following/<str:username>/', UserFollowingListView.as_view(), name='user_following'),
     path('users/', AllUsersListView.as_view(), name='all_users'),
+    path('users/autocomplete/', UserAutocompleteView.as_view(), name='user_autocomplete'),
+    path('users/suggestions/', FollowSuggestionsView.as_view(), name='follow_suggestions'),
+    path('users/relationships/', UserRelationshipsView.as_view(), name='user_relationships'),
 ]
\ No newline at end of file
@@ -1,13 +1,19 @@
 import pyotp
+import time
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
 import logging
-from .models import UserOTP
+from .models import UserOTP, UserProfile, UserFollow, FollowSuggestion
+from .suggestions import update_follow_suggestions
+from .signals import invalidate_after_commit
+from stream.tasks import run_after_commit
 from django.utils import timezone
-from .email_backend import send_email_via_api  
+from .email_backend import queue_email
 
 def create_send_otp_verification_code(user, request=None, force_regen: bool = False):
     '''
-    Create a pyotp and send in user email using custom API
+    Create a pyotp and queue it to the user's email through the outbox
     '''
     logger = logging.getLogger(__name__)
     otp_obj, _created = UserOTP.objects.get_or_create(user=user)
@@ -25,16 +31,95 @@ def create_send_otp_verification_code(user, request=None, force_regen: bool = Fa
     firstname = getattr(getattr(user, 'profile', None), 'firstname', None) or user.username
     message = f'Hello {firstname},\n\nYour verification code is: {code}\n\nThis code is valid for 1 minute. If you did not request this, please ignore this message.\n\nThank you,\nStream Team | Developer'
     
-    # Debug logging
-    print(f"[OTP DEBUG] Sending OTP to: {user.email}, code: {code}")
-    logger.info(f"[OTP DEBUG] Sending OTP to: {user.email}, code: {code}")
-
     try:
-        send_email_via_api(user.email, subject, message)  # Use API sender
-        print(f"[OTP DEBUG] Email sent successfully to {user.email}")
-        logger.info(f"[OTP DEBUG] Email sent successfully to {user.email}")
-    except Exception as exc:
-        print(f"[OTP DEBUG] Failed to send OTP email for user {user.username}: {exc}")
-        logger.exception('Failed to send OTP email for user %s: %s', user.username, exc)
+        # delivered after commit via the outbox, dropped once the code has expired
+        queue_email(user.email, subject, message, expires_in=totp.interval - int(time.time()) % totp.interval)
+        logger.info('OTP email queued for user %s', user.username)
+    except Exception:
+        logger.exception('Failed to queue OTP email for user %s', user.username)
 
     return otp_obj
+
+
+def follow_user(follower, following):
+    
+    '''
+    Create the follow relationship and bump both denormalized counts in the
+    same transaction, then update the follower's suggestions after commit.
+    Returns False if the follow already existed
+    '''
+    
+    try:
+        with transaction.atomic():
+            UserFollow.objects.create(follower=follower, following=following)
+            UserProfile.objects.filter(user=following).update(followers_count=F('followers_count') + 1)
+            UserProfile.objects.filter(user=follower).update(following_count=F('following_count') + 1)
+            FollowSuggestion.objects.filter(user=follower, suggested_user=following).delete()
+            run_after_commit(update_follow_suggestions, follower, following.id)
+            # counts changed via F() updates, which send no signals
+            invalidate_after_commit(follower.id)
+            invalidate_after_commit(following.id)
+    except IntegrityError:
+        return False
+    
+    return True
+
+
+def unfollow_user(follower, following):
+    
+    '''
+    Remove the follow relationship and decrement both denormalized counts in
+    the same transaction, then update the follower's suggestions after commit.
+    Returns False if there was nothing to remove
+    '''
+    
+    with transaction.atomic():
+        deleted, _ = UserFollow.objects.filter(follower=follower, following=following).delete()
+        if not deleted:
+            return False
+        
+        UserProfile.objects.filter(user=following, followers_count__gt=0).update(followers_count=F('followers_count') - 1)
+        UserProfile.objects.filter(user=follower, following_count__gt=0).update(following_count=F('following_count') - 1)
+        run_after_commit(update_follow_suggestions, follower, following.id)
+        invalidate_after_commit(follower.id)
+        invalidate_after_commit(following.id)
+    
+    return True
+
+
+def get_follow_counts(user):
+    
+    '''Return (followers_count, following_count) from the user's profile'''
+    
+    counts = UserProfile.objects.filter(user=user).values_list('followers_count', 'following_count').first()
+    return counts or (0, 0)
+
+
+
+def get_following_ids(user, user_ids):
+    
+    '''Return the subset of user_ids that user follows, in one query'''
+    
+    if not user_ids:
+        return set()
+    return set(
+        UserFollow.objects.filter(
+            follower=user,
+            following_id__in=user_ids
+        ).values_list('following_id', flat=True)
+    )
+
+
+
+def get_follower_ids(user, user_ids):
+    
+    '''Return the subset of user_ids that follow user, in one query'''
+    
+    if not user_ids:
+        return set()
+    return set(
+        UserFollow.objects.filter(
+            following=user,
+            follower_id__in=user_ids
+        ).values_list('follower_id', flat=True)
+    )
@@ -4,21 +4,37 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import login
 from .serializers import (
     SignUpSerializer, 
     SignInSerializer, 
     UserProfileDetailSerializer,
     UpdateProfileDetailsSerializer,
-    UserFollowSerializer
+    UserCardSerializer,
+    FollowSuggestionSerializer
 )
 from django.contrib.auth.models import User
-from .models import UserProfile, UserFollow
+from django.db.models import Exists, OuterRef, Q
+from django.conf import settings
+from .models import UserProfile, UserFollow, FollowSuggestion
 from django.utils import timezone
 
 
+from stream.pagination import KeysetPagination
+from stream.throttling import TokenBucketThrottle
+from stream.tasks import run_after_commit
 from notifications.utils import create_follow_notification
-from .utils import create_send_otp_verification_code
+from .utils import (
+    create_send_otp_verification_code,
+    follow_user,
+    unfollow_user,
+    get_follow_counts,
+    get_following_ids,
+    get_follower_ids
+)
+from .suggestions import refresh_follow_suggestions
+from .autocomplete import autocomplete_users
 
 import pyotp
 from .models import UserOTP
@@ -30,6 +46,10 @@ class SignUpView(generics.CreateAPIView):
     serializer_class = SignUpSerializer
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [AllowAny]
+    # DRF authenticates before throttling; skip it so a rejected request costs no query
+    authentication_classes = []
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'signup'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
@@ -66,6 +86,13 @@ class SignInView(APIView):
             
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SignInTokenView(TokenObtainPairView):
+    
+    '''JWT sign in, throttled per IP and per username before any password check'''
+    
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'signin'
+
 class UserProfileView(generics.RetrieveAPIView):
     
     '''API endpoint for retrieving user profile details'''
@@ -104,7 +131,13 @@ class UpdateProfileDetailsView(APIView):
             profile = serializer.save()
             
             profile.last_profile_details_update = timezone.now()
-            profile.save()
+            # only the edited columns: a full save would write back stale
+            # follower counts over concurrent F() updates
+            profile.save(update_fields=[
+                *(field for field in serializer.validated_data if field != 'username'),
+                'last_profile_details_update',
+                'updated_at'
+            ])
             
             # Return updated profile with full details
             response_serializer = UserProfileDetailSerializer(
@@ -136,7 +169,7 @@ class UpdateProfileImageView(APIView):
             )
         
         profile.profile_image = request.FILES['profile_image']
-        profile.save()
+        profile.save(update_fields=['profile_image', 'updated_at'])
         
         serializer = UserProfileDetailSerializer(profile, context={'request': request})
         
@@ -172,11 +205,11 @@ class UpdatePasswordView(APIView):
             return Response({'error': 'Old password is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
 
         request.user.set_password(new_password)
-        request.user.save()
+        request.user.save(update_fields=['password'])
 
         # record password change timestamp
         profile.last_password_change = timezone.now()
-        profile.save()
+        profile.save(update_fields=['last_password_change', 'updated_at'])
 
         return Response({'message': 'Password updated successfully'}, status=status.HTTP_200_OK)
     
@@ -196,30 +229,19 @@ class FollowUserView(APIView):
                     'error': 'You cannot follow yourself'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Check if already following
-            follow_obj = UserFollow.objects.filter(
-                follower=request.user,
-                following=user_to_follow
-            ).first()
-            
-            if follow_obj:
+            # Create follow relationship (fails if already following)
+            if not follow_user(request.user, user_to_follow):
                 return Response({
                     'error': 'You are already following this user'
                 }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create follow relationship
-            UserFollow.objects.create(
-                follower=request.user,
-                following=user_to_follow
-            )
  
-            create_follow_notification(request.user, user_to_follow)
+            run_after_commit(create_follow_notification, request.user, user_to_follow)
             
             return Response({
                 'message': f'You are now following {username}',
                 'is_following': True,
-                'followers_count': user_to_follow.followers.count(),
-                'following_count': request.user.following.count()
+                'followers_count': get_follow_counts(user_to_follow)[0],
+                'following_count': get_follow_counts(request.user)[1]
             }, status=status.HTTP_201_CREATED)
             
         except User.DoesNotExist:
@@ -231,23 +253,16 @@ class FollowUserView(APIView):
         try:
             user_to_unfollow = User.objects.get(username=username)
             
-            follow_obj = UserFollow.objects.filter(
-                follower=request.user,
-                following=user_to_unfollow
-            ).first()
-            
-            if not follow_obj:
+            if not unfollow_user(request.user, user_to_unfollow):
                 return Response({
                     'error': 'You are not following this user'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            follow_obj.delete()
-            
             return Response({
                 'message': f'You have unfollowed {username}',
                 'is_following': False,
-                'followers_count': user_to_unfollow.followers.count(),
-                'following_count': request.user.following.count()
+                'followers_count': get_follow_counts(user_to_unfollow)[0],
+                'following_count': get_follow_counts(request.user)[1]
             }, status=status.HTTP_200_OK)
             
         except User.DoesNotExist:
@@ -255,7 +270,35 @@ class FollowUserView(APIView):
                 'error': 'User not found'
             }, status=status.HTTP_404_NOT_FOUND)
             
-class UserFollowersListView(APIView):
+class UserFollowListMixin:
+    
+    '''
+    Shared paging for follower/following lists: compact user cards, keyset
+    paginated on follow time, with is_following batched per page
+    '''
+    
+    def get_follow_page(self, request, follows, related):
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(
+            follows.select_related(f'{related}__profile'),
+            request
+        )
+        
+        profiles = [
+            getattr(getattr(follow, related), 'profile', None)
+            for follow in page
+        ]
+        profiles = [profile for profile in profiles if profile]
+        following_ids = get_following_ids(request.user, [profile.user_id for profile in profiles])
+        
+        serializer = UserCardSerializer(
+            profiles,
+            many=True,
+            context={'request': request, 'following_ids': following_ids}
+        )
+        return serializer.data, paginator.get_next_link()
+        
+class UserFollowersListView(UserFollowListMixin, APIView):
     
     '''API endpoint to get list of followers'''
     
@@ -263,21 +306,26 @@ class UserFollowersListView(APIView):
     
     def get(self, request, username):
         try:
-            user = User.objects.get(username=username)
-            followers = UserFollow.objects.filter(following=user)
-            serializer = UserFollowSerializer(followers, many=True, context={'request': request})
-            
-            return Response({
-                'count': followers.count(),
-                'followers': serializer.data
-            }, status=status.HTTP_200_OK)
-            
+            user = User.objects.select_related('profile').get(username=username)
         except User.DoesNotExist:
             return Response({
                 'error': 'User not found'
             }, status=status.HTTP_404_NOT_FOUND)
+        
+        followers, next_link = self.get_follow_page(
+            request,
+            UserFollow.objects.filter(following=user),
+            'follower'
+        )
+        profile = getattr(user, 'profile', None)
+        
+        return Response({
+            'count': profile.followers_count if profile else 0,
+            'followers': followers,
+            'next': next_link
+        }, status=status.HTTP_200_OK)
 
-class UserFollowingListView(APIView):
+class UserFollowingListView(UserFollowListMixin, APIView):
     
     '''API endpoint to get list of users being followed'''
     
@@ -285,64 +333,217 @@ class UserFollowingListView(APIView):
     
     def get(self, request, username):
         try:
-            user = User.objects.get(username=username)
-            following = UserFollow.objects.filter(follower=user)
-            serializer = UserFollowSerializer(following, many=True, context={'request': request})
-            
-            return Response({
-                'count': following.count(),
-                'following': serializer.data
-            }, status=status.HTTP_200_OK)
-            
+            user = User.objects.select_related('profile').get(username=username)
         except User.DoesNotExist:
             return Response({
                 'error': 'User not found'
             }, status=status.HTTP_404_NOT_FOUND)
+        
+        following, next_link = self.get_follow_page(
+            request,
+            UserFollow.objects.filter(follower=user),
+            'following'
+        )
+        profile = getattr(user, 'profile', None)
+        
+        return Response({
+            'count': profile.following_count if profile else 0,
+            'following': following,
+            'next': next_link
+        }, status=status.HTTP_200_OK)
 
-class AllUsersListView(APIView):
+class FollowSuggestionsView(APIView):
     
-    '''API endpoint to get all users'''
+    '''
+    API endpoint for "people you may know"
+    Serves the precomputed suggestions with a single indexed read
+    '''
     
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        try:
-            users = User.objects.filter(is_superuser=False).exclude(id=request.user.id)
+        limit = getattr(settings, 'FOLLOW_SUGGESTIONS_LIMIT', 20)
+        suggestions = list(
+            FollowSuggestion.objects.filter(
+                user=request.user,
+                suggested_user__profile__isnull=False
+            ).select_related('suggested_user__profile')[:limit]
+        )
+        
+        if not suggestions:
+            # nothing computed yet (e.g. new account): build them in the background
+            run_after_commit(refresh_follow_suggestions, request.user)
+        
+        serializer = FollowSuggestionSerializer(
+            suggestions,
+            many=True,
+            context={'request': request, 'following_ids': set()}
+        )
+        
+        return Response({
+            'count': len(suggestions),
+            'suggestions': serializer.data
+        }, status=status.HTTP_200_OK)
 
-            following_ids = UserFollow.objects.filter(
-                follower=request.user
-            ).values_list('following_id', flat=True)
-            
-            users_data = []
-            for user in users:
-                if hasattr(user, 'profile'):
-                    profile = user.profile
-                    profile_image_url = None
-                    if profile.profile_image:
-                        profile_image_url = request.build_absolute_uri(profile.profile_image.url)
-                    
-                    users_data.append({
-                        'username': user.username,
-                        'email': user.email,
-                        'firstname': profile.firstname,
-                        'lastname': profile.lastname,
-                        'profile_image_url': profile_image_url,
-                        'role': profile.role,
-                        'department': profile.department,
-                        'is_following': user.id in following_ids,
-                        'followers_count': user.followers.count(),
-                        'following_count': user.following.count()
-                    })
-            
+class UserRelationshipsView(APIView):
+    
+    '''
+    API endpoint to look up the viewer's relationship with many users at once
+    Body: {"usernames": [...]} or {"ids": [...]}; returns following,
+    followed_by and mutual flags keyed by the given username/id
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    max_users = 300
+    
+    def post(self, request):
+        usernames = request.data.get('usernames')
+        ids = request.data.get('ids')
+        lookup = usernames if usernames is not None else ids
+        
+        if not isinstance(lookup, list) or not lookup:
             return Response({
-                'count': len(users_data),
-                'users': users_data
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
+                'error': 'Provide a non-empty list of usernames or ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(lookup) > self.max_users:
             return Response({
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': f'At most {self.max_users} users can be looked up at once'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if usernames is not None:
+            keys_by_id = dict(
+                User.objects.filter(username__in=[str(name) for name in usernames]).values_list('id', 'username')
+            )
+        else:
+            try:
+                keys_by_id = {int(pk): int(pk) for pk in ids}
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'ids must be integers'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        following_ids = get_following_ids(request.user, list(keys_by_id))
+        follower_ids = get_follower_ids(request.user, list(keys_by_id))
+        
+        relationships = {}
+        for user_id, key in keys_by_id.items():
+            following = user_id in following_ids
+            followed_by = user_id in follower_ids
+            relationships[key] = {
+                'following': following,
+                'followed_by': followed_by,
+                'mutual': following and followed_by
+            }
+        
+        return Response({
+            'relationships': relationships
+        }, status=status.HTTP_200_OK)
+
+class UserAutocompleteView(APIView):
+    
+    '''
+    API endpoint for mention/search type-ahead
+    ?q= matches username, firstname or lastname by prefix; ?limit= caps
+    the results. Exact username matches and the viewer's connections rank first
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    default_limit = 8
+    max_limit = 20
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+        
+        profiles, following_ids = autocomplete_users(request.user, query, limit)
+        
+        serializer = UserCardSerializer(
+            profiles,
+            many=True,
+            context={'request': request, 'following_ids': following_ids}
+        )
+        
+        return Response({
+            'count': len(profiles),
+            'users': serializer.data
+        }, status=status.HTTP_200_OK)
+
+class AllUsersListView(APIView):
+    
+    '''
+    API endpoint for the user directory, ordered by name and cursor paginated
+    Filters: ?role=, ?department=, ?course=, ?search= (name/username prefix)
+    is_following is annotated so each page is a single query
+    '''
+    
+    permission_classes = [IsAuthenticated]
+    filter_fields = ('role', 'department', 'course')
+    
+    def get_queryset(self, request):
+        users = User.objects.filter(
+            is_superuser=False,
+            profile__isnull=False
+        ).exclude(
+            id=request.user.id
+        ).select_related('profile').annotate(
+            is_following=Exists(UserFollow.objects.filter(
+                follower=request.user,
+                following=OuterRef('pk')
+            ))
+        )
+        
+        for field in self.filter_fields:
+            value = request.query_params.get(field)
+            if value:
+                users = users.filter(**{f'profile__{field}': value})
+        
+        for term in request.query_params.get('search', '').split()[:3]:
+            users = users.filter(
+                Q(username__istartswith=term) |
+                Q(profile__firstname__istartswith=term) |
+                Q(profile__lastname__istartswith=term)
+            )
+        
+        return users
+    
+    def get(self, request):
+        paginator = KeysetPagination(ordering=('profile__lastname', 'profile__firstname', 'id'))
+        users = paginator.paginate_queryset(self.get_queryset(request), request)
+        
+        users_data = []
+        for user in users:
+            profile = user.profile
+            profile_image_url = None
+            if profile.profile_image:
+                profile_image_url = request.build_absolute_uri(profile.profile_image.url)
+            
+            users_data.append({
+                'username': user.username,
+                'email': user.email,
+                'firstname': profile.firstname,
+                'lastname': profile.lastname,
+                'profile_image_url': profile_image_url,
+                'role': profile.role,
+                'department': profile.department,
+                'course': profile.course,
+                'is_following': user.is_following,
+                'followers_count': profile.followers_count,
+                'following_count': profile.following_count
+            })
+        
+        return Response({
+            'page_count': len(users_data),
+            'users': users_data,
+            'next': paginator.get_next_link()
+        }, status=status.HTTP_200_OK)
             
             
 class OTPVerifyView(APIView):
@@ -352,6 +553,9 @@ class OTPVerifyView(APIView):
     '''
     
     permission_classes =  [AllowAny]
+    authentication_classes = []
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'otp_verify'
     
     def post(self, request):
         username = request.data.get('username')
@@ -398,6 +602,9 @@ class OTPResendView(APIView):
     '''
     
     permission_classes =  [AllowAny]
+    authentication_classes = []
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'otp_resend'
     
     def post(self, request):
         username = request.data.get('username')
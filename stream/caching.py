@@ -0,0 +1,47 @@
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+# backends whose entries live in one worker process only
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias='default'):
+
+    '''
+    True when every worker process sees the same cache (e.g. Redis)
+    State that must agree across workers - invalidation, authorization,
+    rate limits - is only cached when this holds
+    '''
+
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def get_cache_version(key):
+
+    '''
+    Version token stored at key, for versioned cache entries
+    A missing key (never set, or evicted) gets a fresh random token instead of
+    falling back to a fixed default, so entries written under an old version
+    can never become readable again
+    '''
+
+    version = cache.get(key)
+    if version is None:
+        version = secrets.token_hex(8)
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_cache_versions(keys):
+
+    '''Move every key to a new version, orphaning the entries cached under the old one'''
+
+    keys = list(keys)
+    if keys:
+        cache.set_many({key: secrets.token_hex(8) for key in keys}, None)
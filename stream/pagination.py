@@ -0,0 +1,173 @@
+import base64
+import binascii
+import heapq
+import json
+from datetime import date, datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination:
+
+    '''
+    Cursor pagination that seeks on a tuple of ordering fields instead of
+    using OFFSET, so deep pages cost the same as the first one.
+    The last ordering field must be unique (usually id).
+    '''
+
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('-created_at', '-id'), page_size=None):
+        self.ordering = tuple(ordering)
+        if page_size:
+            self.page_size = page_size
+        self.request = None
+        self.next_position = None
+
+    def paginate_queryset(self, queryset, request):
+
+        '''Return one page of objects starting after the requested cursor'''
+
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+
+        results = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = self.get_position(results[-1])
+
+        return results
+
+    def paginate_merged(self, queryset, field, values, request):
+
+        '''
+        Paginate queryset as a k-way merge of its partitions (field=value for
+        each value), e.g. one per community. Each partition is read with its
+        own seek and LIMIT, an index range scan on (field, *ordering), and the
+        sorted streams are merged, so the union is never sorted as a whole.
+        Where the database takes ORDER BY/LIMIT inside a UNION (PostgreSQL,
+        MySQL) the seeks go out as one UNION ALL query and its rows are
+        heap-selected here; elsewhere each partition is its own query.
+        All ordering fields must sort in the same direction and the last one
+        must be the primary key
+        '''
+
+        directions = {name.startswith('-') for name in self.ordering}
+        if len(directions) > 1:
+            raise ValueError('paginate_merged needs a single ordering direction')
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, queryset.model)
+        seek = self.seek_filter(position) if position is not None else Q()
+        names = [name.lstrip('-') for name in self.ordering]
+
+        streams = [
+            queryset.filter(seek, **{field: value}).order_by(*self.ordering).values_list(*names)[:page_size + 1]
+            for value in values
+        ]
+        reverse = directions.pop()
+
+        if len(streams) > 1 and connections[queryset.db].features.supports_slicing_ordering_in_compound:
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            keys = select(page_size + 1, streams[0].union(*streams[1:], all=True))
+        else:
+            keys = list(islice(heapq.merge(*streams, reverse=reverse), page_size + 1))
+
+        self.next_position = None
+        if len(keys) > page_size:
+            keys = keys[:page_size]
+            self.next_position = list(keys[-1])
+
+        objects = queryset.in_bulk([key[-1] for key in keys])
+        return [objects[key[-1]] for key in keys if key[-1] in objects]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def seek_filter(self, position):
+
+        '''
+        Build the "row comes after position" filter, e.g. for (-created_at, -id):
+        created_at < c OR (created_at = c AND id < i)
+        '''
+
+        query = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                clause &= Q(**{previous.lstrip('-'): value})
+            query |= clause
+        return query
+
+    def get_position(self, obj):
+        position = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip('-').split('__'):
+                value = value[attr] if isinstance(value, dict) else getattr(value, attr)
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request, model):
+
+        '''Return the position stored in the cursor query param, or None on the first page'''
+
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self._resolve_field(model, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_cursor(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _resolve_field(model, path):
+        parts = path.split('__')
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(parts[-1])
@@ -157,13 +157,57 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'portal.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # token buckets for stream.throttling.TokenBucketThrottle: "<scope>" is
+    # per client IP, "<scope>_username" per submitted username. Buckets are
+    # shared between workers only with REDIS_URL set (see CACHES below)
+    # The client IP is the right-most X-Forwarded-For entry added by the
+    # trusted proxies (Render's load balancer is one hop); anything a client
+    # puts in the header before that is ignored
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+    'DEFAULT_THROTTLE_RATES': {
+        'signin': '20/min',
+        'signin_username': '5/min',
+        'signup': '10/hour',
+        'signup_username': '3/hour',
+        'otp_resend': '10/hour',
+        'otp_resend_username': '3/min',
+        'otp_verify': '30/min',
+        'otp_verify_username': '5/min',
+    },
 }
 
+# -- CACHE CONFIGURATION --
+# Redis when REDIS_URL is set (render.yaml provisions it), shared by every
+# worker. The per-process memory fallback is for local development: caches
+# that must agree across workers (JWT users, memberships) are then bypassed,
+# see stream/caching.py
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'stream',
+        }
+    }
+
+# seconds a JWT-authenticated user (and profile) stays cached, see portal/authentication.py
+# (shared caches only)
+AUTH_USER_CACHE_TTL = 60
+# seconds a user's community memberships stay cached, see community/permissions.py
+# (shared caches only)
+COMMUNITY_MEMBERSHIP_CACHE_TTL = 300
+
 # -- JWT --
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -186,6 +230,45 @@ CORS_ALLOW_CREDENTIALS = True
 # -- EMAIL CONFIGURATION --
 EMAIL_API_URL = 'https://christiangarcia.pythonanywhere.com/send'
 EMAIL_API_TIMEOUT = 10
+# outbox delivery (portal.email_backend / send_outbox_emails)
+EMAIL_API_POOL_SIZE = 4
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 30
+EMAIL_OUTBOX_RETENTION_DAYS = 7
+
+
+# -- BACKGROUND TASKS --
+# post-commit side effects (notifications, ...) run on a small bounded
+# in-process thread pool, see stream/tasks.py
+BACKGROUND_TASKS_ASYNC = os.getenv('BACKGROUND_TASKS_ASYNC', 'true').lower() == 'true'
+BACKGROUND_TASK_WORKERS = int(os.getenv('BACKGROUND_TASK_WORKERS', 2))
+BACKGROUND_TASK_QUEUE_SIZE = int(os.getenv('BACKGROUND_TASK_QUEUE_SIZE', 200))
+
+
+# -- COMMUNITY FEED --
+# viewers in more communities than this get the feed as a k-way merge of
+# per-community index scans instead of one query over all of them
+COMMUNITY_FEED_MERGE_THRESHOLD = 10
+
+# -- COMMUNITY DISCOVERY --
+# days of posts and new members counted by `python manage.py refresh_community_activity`
+COMMUNITY_ACTIVITY_WINDOW_DAYS = 7
+# rows younger than this are left for the next `python manage.py rollup_community_stats`
+# run so transactions still in flight are not skipped by the watermark
+COMMUNITY_ROLLUP_LAG_SECONDS = 60
+# each run also rescans this far behind the watermark for rows that committed late
+COMMUNITY_ROLLUP_OVERLAP_SECONDS = 600
+
+# -- FOLLOW SUGGESTIONS --
+# number of "people you may know" entries stored per user
+FOLLOW_SUGGESTIONS_LIMIT = 20
+
+
+# -- NOTIFICATION RETENTION --
+# read notifications older than READ days and any notification older than
+# MAX days are removed by `python manage.py purge_notifications` (0 disables a rule)
+NOTIFICATION_READ_RETENTION_DAYS = int(os.getenv('NOTIFICATION_READ_RETENTION_DAYS', 30))
+NOTIFICATION_MAX_RETENTION_DAYS = int(os.getenv('NOTIFICATION_MAX_RETENTION_DAYS', 180))
 
 
 # --- MEDIA FILES CONFIGURATION ---
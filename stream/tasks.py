@@ -0,0 +1,81 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(getattr(settings, 'BACKGROUND_TASK_QUEUE_SIZE', 200))
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+                    thread_name_prefix='stream-tasks'
+                )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__name__', func))
+
+
+def _run_queued(func, args, kwargs):
+    # worker threads keep their own database connection between tasks
+    close_old_connections()
+    try:
+        _run(func, args, kwargs)
+    finally:
+        close_old_connections()
+        _slots.release()
+
+
+def submit(func, *args, **kwargs):
+
+    '''
+    Run func on the background thread pool
+    The queue is bounded; when it is full the task runs inline instead of
+    being dropped, which pushes back on the caller
+    '''
+
+    executor = _get_executor()
+
+    if not _slots.acquire(blocking=False):
+        logger.warning('Background task queue is full, running %s inline', getattr(func, '__name__', func))
+        _run(func, args, kwargs)
+        return
+
+    try:
+        executor.submit(_run_queued, func, args, kwargs)
+    except RuntimeError:
+        # executor already shut down (interpreter exiting)
+        _slots.release()
+        _run(func, args, kwargs)
+
+
+def run_after_commit(func, *args, **kwargs):
+
+    '''
+    Schedule a side effect (notification, email, ...) for after the current
+    transaction commits. It never runs if the transaction rolls back and
+    never adds latency to the request that triggered it.
+    With BACKGROUND_TASKS_ASYNC = False it runs synchronously on commit.
+    '''
+
+    if getattr(settings, 'BACKGROUND_TASKS_ASYNC', True):
+        transaction.on_commit(lambda: submit(func, *args, **kwargs), robust=True)
+    else:
+        transaction.on_commit(lambda: _run(func, args, kwargs), robust=True)
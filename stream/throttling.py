@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .caching import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# in-process buckets used while the shared cache is unavailable
+_local_buckets = {}
+_local_lock = threading.Lock()
+LOCAL_BUCKET_LIMIT = 10000
+
+_warned_local_cache = False
+
+
+def parse_rate(rate):
+
+    '''"10/min" -> (capacity 10, refill 10 tokens per 60s), None disables the bucket'''
+
+    if not rate:
+        return None
+    num, period = rate.split('/')
+    return int(num), int(num) / DURATIONS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+
+    '''
+    Token-bucket throttle keyed by client IP and by the submitted username
+    The view names its scope with `throttle_scope`; the rates come from
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] under "<scope>" (per IP) and
+    "<scope>_username" (per username), e.g. {'signin': '20/min',
+    'signin_username': '5/min'}. A request needs a token from every bucket
+    it maps to. The IP is DRF's get_ident, which takes the client address
+    from X-Forwarded-For only as far as REST_FRAMEWORK['NUM_PROXIES']
+    trusts it. Buckets live in the Django cache; if the cache fails,
+    per-process buckets take over. DRF authenticates before it throttles, so
+    anonymous views set authentication_classes = [] to reject without any
+    query.
+    The cache read and write are not atomic, so a burst racing across
+    workers can get a few extra tokens through.
+    The limits only hold across workers with a shared cache (REDIS_URL);
+    with the per-process fallback each worker keeps its own buckets, so a
+    client gets up to WEB_CONCURRENCY times the rate. That is logged once
+    per process
+    '''
+
+    cache = default_cache
+    timer = time.time
+    cache_format = 'throttle:{scope}:{kind}:{ident}'
+    username_field = 'username'
+
+    def get_rate(self, name):
+        return parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(name))
+
+    def get_username(self, request):
+        # a malformed body raises here and gets the view's usual 400
+        data = request.data
+        username = data.get(self.username_field) if hasattr(data, 'get') else None
+        if isinstance(username, str) and username.strip():
+            return username.strip().lower()
+        return None
+
+    def get_buckets(self, request, scope):
+        buckets = []
+
+        rate = self.get_rate(scope)
+        if rate:
+            buckets.append((self.cache_format.format(scope=scope, kind='ip', ident=self.get_ident(request)), *rate))
+
+        rate = self.get_rate(f'{scope}_username')
+        username = self.get_username(request) if rate else None
+        if username:
+            # hashed so any submitted value makes a valid cache key
+            ident = hashlib.sha1(username.encode()).hexdigest()
+            buckets.append((self.cache_format.format(scope=scope, kind='user', ident=ident), *rate))
+
+        return buckets
+
+    def load(self, keys):
+        try:
+            return self.cache.get_many(keys), True
+        except Exception:
+            logger.warning('Throttle cache unavailable, using in-process buckets', exc_info=True)
+            with _local_lock:
+                return {key: _local_buckets[key] for key in keys if key in _local_buckets}, False
+
+    def store(self, states, timeout, shared):
+        if shared:
+            try:
+                self.cache.set_many(states, timeout)
+                return
+            except Exception:
+                logger.warning('Throttle cache unavailable, using in-process buckets', exc_info=True)
+
+        with _local_lock:
+            if len(_local_buckets) > LOCAL_BUCKET_LIMIT:
+                _local_buckets.clear()
+            _local_buckets.update(states)
+
+    def warn_local_cache(self):
+        global _warned_local_cache
+
+        if not _warned_local_cache and self.cache is default_cache and not is_shared_cache():
+            _warned_local_cache = True
+            logger.warning('Throttle buckets are per process: no shared cache is configured (set REDIS_URL)')
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        buckets = self.get_buckets(request, scope) if scope else []
+        if not buckets:
+            return True
+
+        self.warn_local_cache()
+
+        now = self.timer()
+        states, shared = self.load([key for key, _capacity, _refill in buckets])
+
+        self.wait_seconds = 0
+        updated = {}
+        for key, capacity, refill in buckets:
+            tokens, stamp = states.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - stamp) * refill)
+            if tokens < 1:
+                self.wait_seconds = max(self.wait_seconds, (1 - tokens) / refill)
+            updated[key] = (tokens - 1, now)
+
+        if self.wait_seconds:
+            return False
+
+        # keep a bucket until it would have refilled completely
+        timeout = max(math.ceil(capacity / refill) for _key, capacity, refill in buckets)
+        self.store(updated, timeout, shared)
+        return True
+
+    def wait(self):
+        return math.ceil(self.wait_seconds)
@@ -1,3 +1,53 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from notifications.models import Notification
+from notifications.utils import create_like_notification
+from stream.tasks import run_after_commit
+from .models import ThreadPost
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class NotificationDispatchTests(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        self.liker = User.objects.create_user('liker', password='pw')
+        self.thread = ThreadPost.objects.create(author=self.author, title='thread', content='c')
+        self.client.force_authenticate(self.liker)
+
+    def like(self):
+        return self.client.post(reverse('thread-like', args=[self.thread.id]))
+
+    def test_like_notifies_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.like()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Notification.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Notification.objects.filter(recipient=self.author, notification_type='like').count(), 1)
+
+    def test_relike_refreshes_the_same_notification(self):
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.like()
+
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 1)
+
+    def test_rolled_back_work_notifies_nobody(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    run_after_commit(create_like_notification, self.thread, self.liker)
+                    raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Notification.objects.exists())
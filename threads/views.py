@@ -13,6 +13,7 @@ from .serializers import (
     ThreadCommentReplySerializer,
 )
 
+from stream.tasks import run_after_commit
 from notifications.utils import (
     create_like_notification,
     create_comment_notification,
@@ -50,10 +51,10 @@ class ThreadPostCreateView(APIView):
             # Check if thread is an announcement
             if thread.thread_type == 'announcement':
                 # Notify all users about the announcement
-                create_announcement_notification(thread, request.user)
+                run_after_commit(create_announcement_notification, thread, request.user)
             else:
                 # Notify only followers about regular posts
-                create_new_post_notification(thread, request.user)
+                run_after_commit(create_new_post_notification, thread, request.user)
             
             response_serializer = ThreadPostSerializer(thread, context={'request': request}) 
             
@@ -165,7 +166,7 @@ class ThreadCommentListCreateView(APIView):
         if serializer.is_valid():
             comment = serializer.save(author=request.user, thread=thread)
             
-            create_comment_notification(comment, thread, request.user)
+            run_after_commit(create_comment_notification, comment, thread, request.user)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -185,7 +186,7 @@ class ThreadLikeToggleView(APIView):
         like, created = ThreadLike.objects.get_or_create(thread=thread, user=request.user)
         if created:
    
-            create_like_notification(thread, request.user)
+            run_after_commit(create_like_notification, thread, request.user)
             
             return Response({'message': 'Liked', 'likes_count': thread.likes.count(), 'is_liked': True}, status=status.HTTP_201_CREATED)
         else:
@@ -206,7 +207,7 @@ class ThreadCommentLikeToggleView(APIView):
 
         like, created = ThreadCommentLike.objects.get_or_create(comment=comment, user=request.user)
         if created:
-            create_comment_like_notification(comment, request.user)
+            run_after_commit(create_comment_like_notification, comment, request.user)
             
             return Response({
                 'message': 'Liked', 
@@ -241,7 +242,7 @@ class ThreadCommentReplyListCreateView(APIView):
         if serializer.is_valid():
             reply = serializer.save(author=request.user, comment=comment)
             
-            create_reply_notification(reply, comment, request.user)
+            run_after_commit(create_reply_notification, reply, comment, request.user)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -259,7 +260,7 @@ class ThreadCommentReplyLikeToggleView(APIView):
 
         like, created = ThreadCommentReplyLike.objects.get_or_create(reply=reply, user=request.user)
         if created:
-            create_reply_like_notification(reply, request.user)
+            run_after_commit(create_reply_like_notification, reply, request.user)
             
             return Response({
                 'message': 'Liked', 